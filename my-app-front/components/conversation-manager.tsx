@@ -513,6 +513,29 @@ export function ConversationManager() {
               prev ? { ...prev, title: data.title } : null
             );
           }
+        } else if (data.type === "messages_appended") {
+          // Keep the sidebar title in step; it is generated from the first message of a conversation
+          if (data.title) {
+            setConversations(prev =>
+              prev.map(conv =>
+                conv.id === data.conversation_id
+                  ? { ...conv, title: data.title, updated_at: data.updated_at ?? conv.updated_at }
+                  : conv
+              )
+            );
+          }
+
+          // Append the messages stored during the last turn instead of reloading the whole conversation
+          if (currentConversation?.id === data.conversation_id) {
+            setCurrentConversation(prev =>
+              prev ? {
+                ...prev,
+                title: data.title ?? prev.title,
+                updated_at: data.updated_at ?? prev.updated_at,
+                messages: [...(prev.messages || []), ...data.messages]
+              } : null
+            );
+          }
         } else if (data.type === "conversation_deleted") {
           // Remove the conversation from the list immediately
           setConversations(prev =>
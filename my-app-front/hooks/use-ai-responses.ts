@@ -220,6 +220,15 @@ export function useAIResponses() {
               }
             }
 
+            // Queued parts continue the current response, so let it keep playing
+            // (same delay as below so parts are handed to the browser in the order they arrived)
+            if (data.queue) {
+              setTimeout(() => {
+                webTTS.speak(data.text, undefined, true);
+              }, 100);
+              return;
+            }
+
             // Stop any existing speech before starting new one
             webTTS.stopSpeaking();
 
@@ -250,8 +259,8 @@ export function useAIResponses() {
 
               setResponses((prev) => [...prev, newResponse]);
 
-              // Auto-speak if enabled in settings
-              if (webTTS && settings.autoSpeak) {
+              // Auto-speak if enabled in settings, unless the server already spoke it while it streamed
+              if (webTTS && settings.autoSpeak && !data.speech_streamed) {
                 try {
                   // Create a hash for tracking
                   const messageHash = createMessageHash(data.text);
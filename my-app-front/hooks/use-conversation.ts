@@ -357,6 +357,63 @@ export function useConversation() {
             const newMessages = [...prev, newMessage];
             return newMessages;
           });
+        } else if (data.type === "messages_appended") {
+          // Only reconcile the conversation that is currently shown
+          const currentConversationId = localStorage.getItem('current-conversation-id');
+          if (currentConversationId && data.conversation_id !== currentConversationId) {
+            return;
+          }
+
+          // The messages stored during the last turn, with their server ids
+          const serverMessages: Message[] = (data.messages || []).map((msg: any) => ({
+            id: msg.id,
+            type: msg.type as MessageType,
+            text: msg.content,
+            timestamp: new Date(msg.timestamp).getTime(),
+            conversation_id: data.conversation_id
+          }));
+
+          setMessages(prev => {
+            // Messages shown while the turn was running only have local ids
+            const isPlaceholder = (msg: Message) =>
+              msg.id.startsWith('user-echo-') || msg.id.startsWith('ai-response-');
+            const replaced = new Set<string>();
+            let insertAt = -1;
+
+            const toAdd = serverMessages.filter(serverMsg => {
+              // Already reconciled (for example when the packet was delivered twice)
+              if (prev.some(msg => msg.id === serverMsg.id)) {
+                return false;
+              }
+
+              // Replace the placeholder showing the same text; an AI answer may have been shown
+              // with different text (a fallback message), so fall back to the latest AI placeholder
+              const candidates = prev.filter(msg =>
+                isPlaceholder(msg) && !replaced.has(msg.id) && msg.type === serverMsg.type
+              );
+              const placeholder = candidates.find(msg => msg.text.trim() === serverMsg.text.trim()) ||
+                (serverMsg.type === 'ai' ? candidates[candidates.length - 1] : undefined);
+
+              if (placeholder) {
+                replaced.add(placeholder.id);
+                const index = prev.indexOf(placeholder);
+                insertAt = insertAt === -1 ? index : Math.min(insertAt, index);
+              }
+              return true;
+            });
+
+            if (toAdd.length === 0) {
+              return prev;
+            }
+
+            // Voice turns have no user echo, so the spoken question is added here, just before the answer
+            const kept = prev.filter(msg => !replaced.has(msg.id));
+            if (insertAt === -1) {
+              return [...kept, ...toAdd];
+            }
+            // Placeholders before the insertion point are never removed, so the index is still valid
+            return [...kept.slice(0, insertAt), ...toAdd, ...kept.slice(insertAt)];
+          });
         }
       } catch (e) {
         // Silently handle data parsing errors
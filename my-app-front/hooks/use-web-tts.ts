@@ -258,7 +258,8 @@ export function useWebTTS() {
   }, []);
 
   // Function to speak text
-  const speak = useCallback((text: string, voiceOverride?: SpeechSynthesisVoice) => {
+  // Set queue to play after the current speech instead of interrupting it
+  const speak = useCallback((text: string, voiceOverride?: SpeechSynthesisVoice, queue: boolean = false) => {
     if (typeof window === 'undefined') {
       return false;
     }
@@ -272,8 +273,10 @@ export function useWebTTS() {
     }
 
     try {
-      // Stop any ongoing speech
-      stopSpeaking();
+      // Stop any ongoing speech unless this continues it
+      if (!queue) {
+        stopSpeaking();
+      }
 
       setIsLoading(true);
       setError(null);
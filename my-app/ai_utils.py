@@ -1,8 +1,19 @@
 
+import asyncio
+import functools
+import hashlib
 import logging
+import random
+import re
+import threading
 import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+import orjson
 import requests
-from typing import Dict, Any, List, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Callable, Dict, Any, List, Tuple
 
 import config
 import database
@@ -10,74 +21,354 @@ from ai_prompts import get_system_prompt
 
 logger = logging.getLogger("ai-utils")
 
+# Shared HTTP session so every Groq request, retry and model fallback reuses pooled keep-alive connections
+# instead of paying a new TCP + TLS handshake. Transport-level retries stay off because make_ai_request
+# already retries with its own backoff.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=config.GROQ_POOL_CONNECTIONS,
+    pool_maxsize=config.GROQ_POOL_MAXSIZE,
+    # Spelled out so a urllib3 default change can't add hidden retries (or Retry-After sleeps) under our own
+    max_retries=Retry(total=0, connect=0, read=0, redirect=0, status=0, respect_retry_after_header=False)
+))
+# Groq request headers, set once on the session instead of built on every request
+_SESSION.headers.update({
+    "Authorization": f"Bearer {config.GROQ_API_KEY}",  # API authentication token
+    "Content-Type": "application/json"                 # The body is sent as pre-serialized JSON
+})
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared Groq session, so other modules calling the Groq API reuse its pooled connections.
+    """
+    return _SESSION
 
-def validate_teaching_mode(teaching_mode: str) -> str:
+
+def warm_up_connection() -> None:
     """
-    Validate and normalize a teaching mode string to ensure it's a supported value.
+    Open a pooled keep-alive connection to the Groq API so the first chat request skips the TCP + TLS handshake.
+    """
+    try:
+        # Any response will do; only the connection left in the pool matters
+        _SESSION.head(config.GROQ_API_URL, timeout=config.AI_REQUEST_TIMEOUT)
+        logger.info("Pre-warmed connection to the Groq API")
+    except requests.exceptions.RequestException as e:
+        # Not fatal - the first request will simply connect on its own
+        logger.warning("Could not pre-warm connection to the Groq API: %s", e)
+
 
+def validate_teaching_mode(teaching_mode: str, _modes=config.TEACHING_MODES, _default=config.DEFAULT_TEACHING_MODE) -> str:
     """
-    # Check if the provided teaching mode is in the list of valid modes
-    if teaching_mode in config.TEACHING_MODES:
+    Validate and normalize a teaching mode string to ensure it's a supported value.
+    _modes and _default bind the config values as locals so each call skips the module lookups; don't pass them.
+    """
+    # Check if the provided teaching mode is one of the valid modes
+    # Modes come from client messages, so anything unhashable must be rejected before the set lookup
+    if isinstance(teaching_mode, str) and teaching_mode in _modes:
         return teaching_mode  # Return the valid teaching mode as-is
     # Return the default teaching mode for any invalid input
-    return config.DEFAULT_TEACHING_MODE
+    return _default
+
+
+# The configured default mode, validated once
+_DEFAULT_TEACHING_MODE = validate_teaching_mode(config.DEFAULT_TEACHING_MODE)
 
 
 def extract_conversation_context(conversation_id) -> Tuple[str, str, bool]:
     """
     Extract and validate conversation context from a conversation_id parameter.
     """
-    # Default values for all context parameters
-    actual_conversation_id = conversation_id  # Use the input as-is initially
-    teaching_mode = config.DEFAULT_TEACHING_MODE  # Default to configured teaching mode
-    is_hidden = False  # Default to visible (not hidden) instructions
+    # A plain conversation ID carries no extra context: use the default mode, visible message
+    # Callers pass dict literals, so an exact type check is enough and cheaper than isinstance
+    if type(conversation_id) is not dict:
+        return conversation_id, _DEFAULT_TEACHING_MODE, False
 
-    # Check if conversation_id is a dictionary with additional context
-    if isinstance(conversation_id, dict):
-        # Extract teaching mode from dictionary, using default if not present
-        teaching_mode = conversation_id.get("teaching_mode", teaching_mode)
-        # Extract actual conversation ID from dictionary, using original if not present
-        actual_conversation_id = conversation_id.get("conversation_id", actual_conversation_id)
-        # Extract hidden boolean from dictionary, using default if not present
-        is_hidden = conversation_id.get("is_hidden", is_hidden)
+    # Extract actual conversation ID, teaching mode and hidden flag from the dictionary
+    actual_conversation_id = conversation_id.get("conversation_id", conversation_id)
+    teaching_mode = conversation_id.get("teaching_mode", _DEFAULT_TEACHING_MODE)
+    is_hidden = conversation_id.get("is_hidden", False)
 
     # Validate teaching mode to ensure it's a supported value
-    teaching_mode = validate_teaching_mode(teaching_mode)
+    if teaching_mode != _DEFAULT_TEACHING_MODE:
+        teaching_mode = validate_teaching_mode(teaching_mode)
 
     return actual_conversation_id, teaching_mode, is_hidden
 
 
+def _estimate_tokens(content: str) -> int:
+    """
+    Estimate how many prompt tokens a message costs, from its length.
+    """
+    return len(content) // config.CHARS_PER_TOKEN + config.MESSAGE_TOKEN_OVERHEAD
+
+
+# API role for each stored message type; anything else is sent as an assistant message
+_ROLE_MAP = {"user": "user", "ai": "assistant"}
+
+
 def prepare_conversation_history(messages: List[Dict[str, Any]], teaching_mode: str) -> List[Dict[str, Any]]:
     """
     Prepare and format conversation history for AI model.
 
     """
-    # Get the appropriate system prompt based on the teaching mode
-    system_prompt = get_system_prompt(teaching_mode)
+    # Keep only the last N messages to avoid token limits; slicing first means older messages are never converted
+    recent_messages = messages[-config.MAX_CONVERSATION_HISTORY:]
+
+    # A few long messages can still overflow the model's window, so also trim to an estimated token budget
+    # The shared prompts are read-only views, which the serializer doesn't accept, so each request gets
+    # its own two-key copy; the prompt text itself is shared, not copied
+    system_prompt = dict(get_system_prompt(teaching_mode))
+    budget = config.MAX_PROMPT_TOKENS - _estimate_tokens(system_prompt["content"])
+    # Walk back from the newest message until the budget runs out; the newest one is always kept
+    start = len(recent_messages)
+    while start > 0:
+        budget -= _estimate_tokens(recent_messages[start - 1]["content"])
+        if budget < 0 and start < len(recent_messages):
+            break
+        start -= 1
+    recent_messages = recent_messages[start:]
 
     # The system prompt must always be the first message in the conversation
-    conversation_history = [system_prompt]
-
-    # Add the conversation history by transforming database format to API format
-    conversation_history.extend([
-        {
-            "role": "user" if msg["type"] == "user" else "assistant",  # Map message type to API role
-            "content": msg["content"]  # Use message content as-is
-        }
-        for msg in messages  # Process all messages from the database
-    ])
-
-    # Keep only the last N messages to avoid token limits, but always keep the system prompt
-    max_messages = config.MAX_CONVERSATION_HISTORY + 1  # +1 for system prompt
-    if len(conversation_history) > max_messages:
-        # Keep system prompt (first message) and the most recent conversation messages
-        conversation_history = [conversation_history[0]] + conversation_history[-config.MAX_CONVERSATION_HISTORY:]
+    conversation_history = [
+        system_prompt,
+        # Add the conversation history by transforming database format to API format
+        *(
+            {
+                "role": _ROLE_MAP.get(msg["type"], "assistant"),  # Map message type to API role
+                "content": msg["content"]  # Use message content as-is
+            }
+            for msg in recent_messages  # Process the kept messages from the database
+        )
+    ]
 
     return conversation_history
 
-def make_ai_request(model_name: str, conversation_history: List[Dict[str, Any]], temperature: float = None, max_retries: int = None) -> Tuple[bool, str]:
+def _read_stream(response, on_delta: Callable[[str], None], cancel: threading.Event = None) -> str:
+    """
+    Read a streamed (server-sent events) chat completion, passing each piece of text to on_delta as it arrives.
+    Stops early, returning what was read so far, once cancel is set.
+    """
+    parts = []  # Every content delta received so far, joined once the stream ends
+    length = 0  # Characters received so far
+    try:
+        for line in response.iter_lines():
+            # Events look like "data: {...}"; blank keep-alive lines and comments carry no text
+            if not line.startswith(b"data:"):
+                continue
+            # Another model already answered; stop reading and free the connection
+            if cancel is not None and cancel.is_set():
+                break
+            payload = line[5:].strip()
+            # The stream ends with a literal [DONE] event
+            if payload == b"[DONE]":
+                break
+
+            chunk = orjson.loads(payload)
+            # Errors that happen mid-stream arrive as an event instead of an HTTP status
+            if chunk.get("error"):
+                raise ValueError(f"Stream error: {chunk['error']}")
+
+            choices = chunk.get("choices")
+            if not choices:
+                continue
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+                length += len(delta)
+                # An answer this long can't be stored or shown anyway; stop reading instead of paying for the rest
+                if length > config.MAX_MESSAGE_LENGTH:
+                    logger.warning("Stopped reading a streamed answer at %d characters", length)
+                    break
+    finally:
+        # Hand the connection back to the pool even if the stream was cut short
+        response.close()
+
+    return "".join(parts).strip()
+
+
+def _backoff_delay(error_class: str, attempt: int) -> float:
+    """
+    Return a randomized ("full jitter") wait before retrying after the given class of error.
+    """
+    base, cap = config.AI_RETRY_BACKOFF[error_class]
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class _TokenBucket:
+    """
+    Thread-safe token bucket holding one token per request, refilled continuously at the per-minute rate.
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.capacity = float(requests_per_minute)  # A full minute's worth of requests may be sent in a burst
+        self.tokens = self.capacity
+        self.rate = requests_per_minute / 60.0      # Tokens added per second
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it (0 when one is available now)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Tokens may go negative: later callers queue behind earlier reservations in order
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self) -> None:
+        """Give back a reserved token whose request was never sent"""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+# One bucket per rate-limited model, shared by every conversation in the process
+_RATE_LIMITERS = {name: _TokenBucket(limit) for name, limit in config.AI_MODEL_RATE_LIMITS.items()}
+
+
+# Per-model circuit breakers: after repeated timeouts, 503s or connection errors a model is skipped
+# until its cool-down ends, instead of every request waiting out its retries first
+_breaker_lock = threading.Lock()
+_model_breakers = {}  # Model name -> {"failures": consecutive failures, "open_until": monotonic seconds}
+
+
+def _model_circuit_open(model_name: str) -> bool:
+    """Return True while a model is being skipped after repeated failures"""
+    with _breaker_lock:
+        breaker = _model_breakers.get(model_name)
+        return breaker is not None and time.monotonic() < breaker["open_until"]
+
+
+def _record_model_failure(model_name: str) -> None:
+    """Count a failed attempt; at the threshold, and on every failure after it, skip the model for the cool-down"""
+    with _breaker_lock:
+        breaker = _model_breakers.setdefault(model_name, {"failures": 0, "open_until": 0.0})
+        breaker["failures"] += 1
+        # The count is only reset by a success, so a model that fails again after its cool-down is skipped again at once
+        if breaker["failures"] >= config.AI_MODEL_FAILURE_THRESHOLD:
+            breaker["open_until"] = time.monotonic() + config.AI_MODEL_COOLDOWN
+            logger.warning("Model %s is failing repeatedly, skipping it for %ss", model_name, config.AI_MODEL_COOLDOWN)
+
+
+def _record_model_success(model_name: str) -> None:
+    """Close the model's circuit after a successful request"""
+    with _breaker_lock:
+        _model_breakers.pop(model_name, None)
+
+
+# Groq's rate limit reset headers are durations such as "7.66s", "2m59.56s" or "120ms"
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value: str) -> float:
+    """Convert a Groq reset duration to seconds, or 0 when it can't be parsed"""
+    try:
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in _DURATION_PART.findall(value))
+    except ValueError:
+        return 0.0
+
+
+def _server_retry_delay(response) -> float:
+    """
+    Return how long the server asked us to wait before retrying, in seconds, or 0 without a usable hint.
+    """
+    headers = response.headers
+    # Retry-After is either a number of seconds or an HTTP date
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    # Otherwise use the sooner of Groq's request and token limit resets
+    resets = [_parse_duration(headers.get(name, "")) for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [reset for reset in resets if reset > 0]
+    return min(resets) if resets else 0.0
+
+
+# How make_ai_request handles each kind of failure:
+# (retried, counts toward the model's circuit breaker, waits for the server's retry hint)
+# Retried kinds back off with their config.AI_RETRY_BACKOFF delays
+_RETRY_POLICY = {
+    "timeout": (True, True, False),       # Slow model or network - retry, the model may be overloaded
+    "rate_limit": (True, False, True),    # 429 - our quota, not the model's health
+    "unavailable": (True, True, True),    # 503 - the model is down or overloaded
+    "connection": (True, True, False),    # Could not reach the API
+    "http": (False, False, False),        # Other 4xx/5xx - the request itself is wrong, retrying won't help
+    "invalid": (False, False, False),     # Malformed or empty answer - an API format issue
+    "unexpected": (True, False, False)    # Anything else
+}
+
+
+def _classify_error(error: Exception, model_name: str) -> Tuple[str, str]:
+    """
+    Map a request failure to its _RETRY_POLICY kind and a descriptive error message.
+    """
+    # Timeout first: connect timeouts are also connection errors
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout", f"Request timeout for model {model_name}: {error}"
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code
+        if status == 429:  # Rate limit exceeded
+            return "rate_limit", f"Rate limit exceeded for model {model_name}"
+        if status == 503:  # Service unavailable
+            return "unavailable", f"Service unavailable for model {model_name}"
+        return "http", f"HTTP error {status} for model {model_name}: {error}"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connection", f"Connection error for model {model_name}: {error}"
+    if isinstance(error, ValueError):
+        return "invalid", f"Invalid response from model {model_name}: {error}"
+    return "unexpected", f"Unexpected error with model {model_name}: {error}"
+
+
+def _release_response(response) -> None:
+    """
+    Read the rest of an error response and close it, so its keep-alive connection goes back to the pool.
+    """
+    try:
+        # Error bodies are small; once fully read urllib3 can reuse the connection instead of dropping it
+        response.content
+    except Exception:
+        pass  # The connection is broken anyway; closing it below is all that's left
+    finally:
+        response.close()
+
+
+def _wait(seconds: float, cancel: threading.Event = None) -> None:
+    """
+    Sleep for the given time, waking early if cancel is set.
+    """
+    if cancel is None:
+        time.sleep(seconds)
+    else:
+        cancel.wait(seconds)
+
+
+def _encode_request(data: Dict[str, Any], messages_json: bytes = None) -> bytes:
+    """
+    Serialize request data, splicing in the messages when they were already serialized.
+    """
+    if messages_json is None:
+        return orjson.dumps(data)
+    # Everything but the messages is a handful of small fields, so only they are encoded per request
+    rest = orjson.dumps({key: value for key, value in data.items() if key != "messages"})
+    return b'{"messages":' + messages_json + (b"," + rest[1:] if len(rest) > 2 else b"}")
+
+
+def make_ai_request(model_name: str, conversation_history: List[Dict[str, Any]], temperature: float = None, max_retries: int = None,
+                    on_delta: Callable[[str], None] = None, messages_json: bytes = None,
+                    cancel: threading.Event = None) -> Tuple[bool, str]:
     """
     Make a request to the AI API .
+    When on_delta is given the response is streamed and each piece of text is passed to it as it arrives.
+    messages_json may hold conversation_history already serialized with orjson, so a fallback chain encodes it once.
+    Setting cancel stops the request at its next wait, retry or streamed chunk, for answers nobody needs anymore.
     """
     # Validate that the Groq API key is configured before making any requests
     if not config.GROQ_API_KEY:
@@ -87,128 +378,127 @@ def make_ai_request(model_name: str, conversation_history: List[Dict[str, Any]],
     # Use provided max_retries or fall back to configured default
     max_retries = max_retries or config.AI_MODEL_RETRY_COUNT
 
-    # Prepare HTTP headers for the API request
-    headers = {
-        "Authorization": f"Bearer {config.GROQ_API_KEY}",  # API authentication token
-        "Content-Type": "application/json"                 # Request content type
-    }
-
     # Build the request data using the configuration helper function
     data = config.get_ai_request_data(model_name, conversation_history, temperature)
+    body = None  # Serialized request data, reused by retries until the stream flag changes
+
+    # Once part of an answer has reached on_delta, retries run without streaming so the caller
+    # never receives the opening of the answer twice
+    streamed_any = False
 
-    # Retry loop with exponential backoff for different error types
+    def forward_delta(delta):
+        nonlocal streamed_any
+        streamed_any = True
+        on_delta(delta)
+
+    # Retries stop once their wait would run past this model's time budget; the monotonic clock
+    # can't jump with wall-clock adjustments
+    deadline = time.monotonic() + config.AI_MODEL_TIME_BUDGET
+
+    # Retry loop with jittered exponential backoff for different error types
     for attempt in range(max_retries + 1):  # +1 because range is exclusive
         try:
             # Log the attempt for debugging and monitoring
-            logger.info(f"Making AI request with model: {model_name} (attempt {attempt + 1}/{max_retries + 1})")
+            logger.info("Making AI request with model: %s (attempt %d/%d)", model_name, attempt + 1, max_retries + 1)
+
+            # Decide whether this attempt streams its answer
+            stream = on_delta is not None and not streamed_any
+            if on_delta is not None and data.get("stream") != stream:
+                data["stream"] = stream
+                body = None
+
+            # Serialize the payload with orjson once instead of letting requests re-encode it every attempt
+            if body is None:
+                body = _encode_request(data, messages_json)
+
+            # Checked before taking a rate limit token, so retries cut short by a cancel never spend one
+            if cancel is not None and cancel.is_set():
+                return False, f"Request for model {model_name} cancelled"
+
+            # Wait for capacity under the model's request rate limit rather than being rejected by the API
+            limiter = _RATE_LIMITERS.get(model_name)
+            if limiter is not None:
+                wait_time = limiter.reserve()
+                # Waiting past this model's time budget would only hold the thread; try the next model instead
+                if time.monotonic() + wait_time > deadline:
+                    limiter.refund()
+                    error_msg = f"Rate limit for model {model_name} leaves no time within its budget"
+                    logger.warning(error_msg)
+                    return False, error_msg
+                if wait_time > 0:
+                    logger.info("Rate limiting requests to %s, waiting %.1f seconds", model_name, wait_time)
+                    _wait(wait_time, cancel)
+                    # Cancelled while waiting - the request is never sent, so its token goes back
+                    if cancel is not None and cancel.is_set():
+                        limiter.refund()
+                        return False, f"Request for model {model_name} cancelled"
 
             # Add timeout to prevent hanging requests that could block the application
-            response = requests.post(
+            response = _SESSION.post(
                 config.GROQ_API_URL,           # Groq API endpoint URL
-                headers=headers,               # Authentication and content type headers
-                json=data,                     # Request payload with model and conversation data
+                data=body,                     # Serialized payload with model and conversation data
+                stream=stream,                 # Keep the body unread so streamed text can be consumed as it arrives
                 timeout=config.AI_REQUEST_TIMEOUT  # Timeout tuple: (connect_timeout, read_timeout)
             )
             # Raise an exception for HTTP error status codes (4xx, 5xx)
             response.raise_for_status()
 
-            # Parse the JSON response from the API
-            result = response.json()
+            if stream:
+                # Read the answer incrementally, handing each piece of text to the caller as it arrives
+                ai_response = _read_stream(response, forward_delta, cancel)
+                if cancel is not None and cancel.is_set():
+                    # The text read so far is incomplete and already unwanted
+                    return False, f"Request for model {model_name} cancelled"
+            else:
+                # Parse the JSON response from the API with orjson (a decode error is a ValueError, handled below)
+                result = orjson.loads(response.content)
+
+                # Validate response structure to ensure it contains expected fields
+                choices = result.get("choices")
+                if not choices:
+                    # API returned success but with invalid structure
+                    raise ValueError("Invalid API response: missing choices")
 
-            # Validate response structure to ensure it contains expected fields
-            if not result.get("choices"):
-                # API returned success but with invalid structure
-                raise ValueError("Invalid API response: missing choices")
+                # Extract the AI message from the first choice; a null message or content counts as empty
+                content = (choices[0].get("message") or {}).get("content") or ""
+                ai_response = content.strip()  # Remove surrounding whitespace in the single pass over the text
 
-            # Extract the AI message from the first choice
-            message = result["choices"][0].get("message", {})  # Get message object or empty dict
-            ai_response = message.get("content", "").strip()   # Extract content and remove whitespace
             # Validate that we received actual content
             if not ai_response:
                 # API returned success but with empty content
                 raise ValueError("Empty response from API")
 
-            # Log successful response generation
-            logger.info(f"Successfully generated response with model: {model_name}")
+            # Log successful response generation; the fallback chain reports the winning model at INFO
+            logger.debug("Successfully generated response with model: %s", model_name)
+            _record_model_success(model_name)
             return True, ai_response  # Return success with the AI response text
 
-        # Handle timeout errors with exponential backoff
-        except requests.exceptions.Timeout as e:
-            # Create descriptive error message for timeout
-            error_msg = f"Request timeout for model {model_name}: {e}"
-            # Check if we have more retry attempts available
-            if attempt < max_retries:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s, 8s...
-                logger.warning(f"{error_msg}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)  # Wait before retrying
-                continue  # Try again with next attempt
-            # No more retries available, log final error and return
-            logger.warning(error_msg)
-            return False, error_msg
-
-        # Handle HTTP errors with specific handling for different status codes
-        except requests.exceptions.HTTPError as e:
-            # Check for specific HTTP status codes that require different handling
-            if e.response.status_code == 429:  # Rate limit exceeded
-                error_msg = f"Rate limit exceeded for model {model_name}"
-                # Check if we have more retry attempts available
-                if attempt < max_retries:
-                    wait_time = 5 * (2 ** attempt)  # Longer wait for rate limits: 5s, 10s, 20s, 40s...
-                    logger.warning(f"{error_msg}. Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)  # Wait longer for rate limit recovery
-                    continue  # Try again with next attempt
-                # No more retries available for rate limit
-                logger.warning(error_msg)
-                return False, error_msg
-            elif e.response.status_code == 503:  # Service unavailable
-                error_msg = f"Service unavailable for model {model_name}"
-                # Check if we have more retry attempts available
-                if attempt < max_retries:
-                    wait_time = 3 * (2 ** attempt)  # Wait for service recovery: 3s, 6s, 12s, 24s...
-                    logger.warning(f"{error_msg}. Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)  # Wait for service to recover
-                    continue  # Try again with next attempt
-                # No more retries available for service unavailable
-                logger.warning(error_msg)
-                return False, error_msg
-            else:
-                # Other HTTP errors (4xx, 5xx) that shouldn't be retried
-                error_msg = f"HTTP error {e.response.status_code} for model {model_name}: {e}"
-                logger.warning(error_msg)
-                return False, error_msg  # Don't retry for other HTTP errors
-
-        # Handle connection errors with exponential backoff
-        except requests.exceptions.ConnectionError as e:
-            # Create descriptive error message for connection issues
-            error_msg = f"Connection error for model {model_name}: {e}"
-            # Check if we have more retry attempts available
-            if attempt < max_retries:
-                wait_time = 2 ** attempt  # Exponential backoff for connection issues
-                logger.warning(f"{error_msg}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)  # Wait before retrying connection
-                continue  # Try again with next attempt
-            # No more retries available for connection error
-            logger.warning(error_msg)
-            return False, error_msg
-
-        # Handle invalid response errors (don't retry these)
-        except ValueError as e:
-            # Don't retry for invalid responses as they indicate API format issues
-            error_msg = f"Invalid response from model {model_name}: {e}"
-            logger.warning(error_msg)
-            return False, error_msg  # Return immediately without retrying
-
-        # Handle any other unexpected errors with exponential backoff
+        # Every failure goes through one path; _RETRY_POLICY decides how each kind is handled
         except Exception as e:
-            # Create descriptive error message for unexpected errors
-            error_msg = f"Unexpected error with model {model_name}: {e}"
+            # A streamed request's error body is never read; release it so the connection isn't lost to the pool
+            if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+                _release_response(e.response)
+            kind, error_msg = _classify_error(e, model_name)
+            retried, counts_against_model, has_server_hint = _RETRY_POLICY[kind]
+            if counts_against_model:
+                _record_model_failure(model_name)
             # Check if we have more retry attempts available
-            if attempt < max_retries:
-                wait_time = 2 ** attempt  # Exponential backoff for unexpected errors
-                logger.warning(f"{error_msg}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)  # Wait before retrying
-                continue  # Try again with next attempt
-            # No more retries available for unexpected error
+            if retried and attempt < max_retries:
+                # Jittered exponential backoff with the delays configured for this kind of failure
+                wait_time = _backoff_delay(kind, attempt)
+                if has_server_hint:
+                    # The server's hint says when capacity returns; a wait beyond the backoff cap is better spent on the next model
+                    server_delay = _server_retry_delay(e.response)
+                    wait_time = max(server_delay, wait_time) if server_delay <= config.AI_RETRY_BACKOFF[kind][1] else None
+                # A retry that can't start within the budget is better spent on the next model
+                if wait_time is not None and time.monotonic() + wait_time > deadline:
+                    logger.info("%s. Not retrying, out of time budget for this model", error_msg)
+                    wait_time = None
+                if wait_time is not None:
+                    logger.warning("%s. Retrying in %.1f seconds...", error_msg, wait_time)
+                    _wait(wait_time, cancel)  # Wait before retrying, waking early if cancelled
+                    continue  # Try again with next attempt
+            # Not retryable, or no more retries available - log final error and return
             logger.warning(error_msg)
             return False, error_msg
 
@@ -216,41 +506,142 @@ def make_ai_request(model_name: str, conversation_history: List[Dict[str, Any]],
     return False, f"All retry attempts failed for model {model_name}"
 
 
-def generate_ai_response_with_models(conversation_history: List[Dict[str, Any]]) -> str:
+# Recent successful answers keyed by a hash of the exact request messages, in least-recently-used order.
+# The key covers the system prompt and the whole history, so a hit is only possible for an identical
+# conversation - typically the same opening question in the same teaching mode. Only used on the event loop.
+_response_cache = OrderedDict()
+
+
+def _response_cache_key(messages_json: bytes) -> bytes:
     """
-    Try multiple AI models in sequence to generate a response with comprehensive fallback logic.
+    Hash the serialized messages sent to the model into a compact cache key.
     """
+    return hashlib.blake2b(messages_json, digest_size=16).digest()
+
+
+async def generate_ai_response_with_models_async(conversation_history: List[Dict[str, Any]],
+                                                on_delta: Callable[[str], None] = None) -> str:
+    """
+    Try multiple AI models to generate a response with comprehensive fallback logic.
+    When on_delta is given the answer is streamed to it while it is generated.
+
+    Up to config.AI_PARALLEL_MODELS models are asked at once, in preference order, and the first
+    successful answer wins; each failure starts the next untried model. With one model at a time
+    this is a plain sequential fallback. If config.AI_HEDGE_DELAY is set, the next model is also
+    started whenever that long passes without an answer and before any text has been streamed.
+    Requests run on executor threads, so the event loop and other conversations keep running
+    while they are in progress.
+    """
+    # The history is the same for every model, so it is serialized once here and spliced into each request body
+    messages_json = orjson.dumps(conversation_history)
+
+    # An identical conversation was answered recently - reuse that answer without calling the API
+    cache_key = _response_cache_key(messages_json) if config.AI_RESPONSE_CACHE_SIZE > 0 else None
+    cached = _response_cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        _response_cache.move_to_end(cache_key)
+        logger.info("Reusing cached response for an identical conversation")
+        if on_delta is not None:
+            on_delta(cached)  # Deliver it to a streaming caller as one piece
+        return cached
+
+    loop = asyncio.get_event_loop()
+    # Set once an answer is chosen, so slower requests stop at their next wait or chunk instead of running to the end
+    cancel = threading.Event()
+
     # Initialize list to collect error messages from failed model attempts
     model_errors = []
 
-    # Try each model in sequence until one works
-    for i, model_info in enumerate(config.AI_MODELS):
+    # Only one request streams at a time, and once any part of an answer has been streamed the
+    # remaining models run without streaming, so two different answers are never spliced together
+    state = {
+        "streamed_any": False,  # Some text has reached on_delta
+        "streaming": False,     # A request that streams is in flight
+        "finished": False       # An answer has been returned; late deltas are dropped
+    }
+
+    def forward_delta(delta):
+        if state["finished"]:
+            return  # A faster model already answered
+        state["streamed_any"] = True
+        on_delta(delta)
+
+    # Skip models whose circuit is open; if every model is failing, try them all rather than give up unasked
+    models = [model for model in config.AI_MODELS if not _model_circuit_open(model["name"])] or config.AI_MODELS
+    if len(models) < len(config.AI_MODELS):
+        logger.info("Skipping %d model(s) after repeated failures", len(config.AI_MODELS) - len(models))
+    next_model = 0   # Index of the next untried model
+    in_flight = {}   # Pending request future -> (model name, whether it streams)
+
+    def launch_next_model():
+        nonlocal next_model
         # Extract model configuration from the model info dictionary
+        model_info = models[next_model]
         model_name = model_info["name"]          # The specific model identifier (e.g., "llama-3.3-70b-versatile")
         temperature = model_info["temperature"]  # The creativity/randomness setting for this model
+        next_model += 1
 
         # Log the current attempt for monitoring and debugging
-        logger.info(f"Attempting model {i + 1}/{len(config.AI_MODELS)}: {model_name}")
+        logger.info("Attempting model %d/%d: %s", next_model, len(models), model_name)
+
+        # Make the API request to the model on an executor thread
+        streams = on_delta is not None and not state["streamed_any"] and not state["streaming"]
+        state["streaming"] = state["streaming"] or streams
+        future = loop.run_in_executor(
+            None, functools.partial(make_ai_request, model_name, conversation_history, temperature,
+                                    on_delta=forward_delta if streams else None, messages_json=messages_json,
+                                    cancel=cancel)
+        )
+        in_flight[future] = (model_name, streams)
+
+    # Start the first models; with a parallelism of one this is just the preferred model
+    for _ in range(min(max(config.AI_PARALLEL_MODELS, 1), len(models))):
+        launch_next_model()
+
+    while in_flight:
+        # Hedge only while untried models remain and the user has seen nothing yet; once text is
+        # streaming, the slow part is over and a second answer would be thrown away
+        hedge = config.AI_HEDGE_DELAY if next_model < len(models) and not state["streamed_any"] else 0
+        done, _ = await asyncio.wait(in_flight, timeout=hedge or None, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            # Nothing answered in time - ask the next model as well, keeping the slow one running
+            logger.info("No answer after %s seconds, also trying the next model", hedge)
+            launch_next_model()
+            continue
+        for future in done:
+            model_name, streams = in_flight.pop(future)
+            if streams:
+                state["streaming"] = False
+            success, response = future.result()
+
+            # Check if the model request was successful
+            if success:
+                # Model succeeded - log success and return the response immediately
+                state["finished"] = True
+                if in_flight:
+                    # Executor threads can't be interrupted, but slower requests stop at their next checkpoint
+                    cancel.set()
+                    logger.info("Cancelling %d slower model request(s)", len(in_flight))
+                logger.info("Successfully generated response with model: %s", model_name)
+                if cache_key is not None:
+                    # Remember the answer, dropping the least recently used one when full
+                    _response_cache[cache_key] = response
+                    if len(_response_cache) > config.AI_RESPONSE_CACHE_SIZE:
+                        _response_cache.popitem(last=False)
+                return response  # Return the successful AI response
 
-        # Make the API request to the current model
-        success, response = make_ai_request(model_name, conversation_history, temperature)
-
-        # Check if the model request was successful
-        if success:
-            # Model succeeded - log success and return the response immediately
-            logger.info(f"Successfully generated response with model: {model_name}")
-            return response  # Return the successful AI response
-        else:
             # Model failed - collect error information and try next model
             model_errors.append(f"{model_name}: {response}")  # Store error details for final error message
-            logger.warning(f"Model {model_name} failed: {response}")
+            logger.warning("Model %s failed: %s", model_name, response)
 
-            # Add a small delay before trying the next model (except for the last one)
-            # This prevents overwhelming the API with rapid successive requests
-            if i < len(config.AI_MODELS) - 1:  # Check if this is not the last model
-                delay = config.AI_MODEL_SWITCH_DELAY  # Get configured delay between model attempts
-                logger.info(f"Waiting {delay} seconds before trying next model...")
-                time.sleep(delay)  # Wait before trying the next model
+            if next_model < len(models):
+                # When nothing else is in flight, add a small delay before trying the next model
+                # This prevents overwhelming the API with rapid successive requests
+                if not in_flight:
+                    delay = config.AI_MODEL_SWITCH_DELAY  # Get configured delay between model attempts
+                    logger.info("Waiting %s seconds before trying next model...", delay)
+                    await asyncio.sleep(delay)  # Wait before trying the next model without holding a thread
+                launch_next_model()
 
     # If we get here, all models failed to generate a response
     # Combine all error messages into a comprehensive error report
@@ -258,9 +649,10 @@ def generate_ai_response_with_models(conversation_history: List[Dict[str, Any]])
     # Format the final error message using the configured template
     error_msg = config.ERROR_MESSAGES["all_models_failed"].format(error=error_details)
     # Log the complete failure for monitoring and debugging
-    logger.error(f"All models failed. Details: {error_details}")
+    logger.error("All models failed. Details: %s", error_details)
     return error_msg  # Return the comprehensive error message
 
+
 def should_split_response(response: str) -> bool:
     """
     Check if an AI response should be split based on its length to prevent UI and TTS issues.
@@ -269,15 +661,109 @@ def should_split_response(response: str) -> bool:
     return len(response) > config.MAX_MESSAGE_LENGTH
 
 
+class SpeechSegmenter:
+    """
+    Split a streamed response into parts that can be spoken while the rest is still being generated.
+
+    Parts end at paragraph breaks that are not inside a code block or an [EXPLAIN]/[CODE] section.
+    Each delta is scanned once, and the open/close counts are carried over, so the cost of a delta
+    doesn't grow with the length of the answer.
+    """
+
+    # Paragraph breaks are the only safe cut points: sentence punctuation also shows up in code,
+    # numbers and URLs, and the client's speech cleanup needs whole sections to work on
+    _TOKENS = re.compile(r"```|\[/?EXPLAIN\]|\[/?CODE\]|\n\n")
+    # Longest text that can be the unfinished start of a token ("[/EXPLAIN" before its "]")
+    _MAX_PARTIAL = len("[/EXPLAIN]") - 1
+
+    def __init__(self):
+        self._parts = []     # Streamed text not yet handed out for speech
+        self._length = 0     # Total length of _parts
+        self._carry = ""     # Unscanned end of the text that may still become a token
+        self._fences = 0     # Code fences opened and not closed (0 or 1)
+        self._explain = 0    # [EXPLAIN] tags minus [/EXPLAIN] tags
+        self._code = 0       # [CODE] tags minus [/CODE] tags
+
+    def feed(self, delta: str) -> str:
+        """
+        Add a streamed piece of text; return the text up to the last safe paragraph break, or "" if there is none yet.
+        """
+        self._parts.append(delta)
+        window = self._carry + delta
+        offset = self._length - len(self._carry)  # Position of window[0] in the unspoken text
+        self._length += len(delta)
+
+        cut = None
+        scanned = 0
+        for match in self._TOKENS.finditer(window):
+            token = match.group()
+            if token == "\n\n":
+                # Only cut where every code fence and tagged section opened so far has been closed
+                if not self._fences and not self._explain and not self._code:
+                    cut = offset + match.end()
+            elif token == "```":
+                self._fences ^= 1
+            elif token == "[EXPLAIN]":
+                self._explain += 1
+            elif token == "[/EXPLAIN]":
+                self._explain -= 1
+            elif token == "[CODE]":
+                self._code += 1
+            else:
+                self._code -= 1
+            scanned = match.end()
+        # Keep only what could still turn into a token once the next delta arrives
+        self._carry = window[max(scanned, len(window) - self._MAX_PARTIAL):]
+
+        if cut is None:
+            return ""
+        text = "".join(self._parts)
+        rest = text[cut:]
+        self._parts = [rest] if rest else []
+        self._length = len(rest)
+        return text[:cut]
+
+    def rest(self) -> str:
+        """
+        Return the streamed text that hasn't been handed out for speech.
+        """
+        return "".join(self._parts)
+
+
+# Recently looked up teaching modes: conversation ID -> (teaching mode, monotonic expiry time), oldest first
+# A conversation's mode only changes when an empty conversation is reused, which invalidates its entry
+# Lookups run on the database thread and invalidation on the event loop, so the lock covers both
+_teaching_mode_cache = OrderedDict()
+_teaching_mode_cache_lock = threading.Lock()
+
+
+def invalidate_teaching_mode(conversation_id: str) -> None:
+    """
+    Drop the cached teaching mode of a conversation after its mode was changed in the database.
+    """
+    with _teaching_mode_cache_lock:
+        _teaching_mode_cache.pop(conversation_id, None)
+
+
 def get_teaching_mode_from_db(conversation_id: str) -> str:
     """
     Retrieve the teaching mode for a specific conversation from the database .
+    Results are cached for config.TEACHING_MODE_CACHE_TTL seconds.
     """
     # Validate that we have a conversation ID to look up
     if not conversation_id:
         # Return default mode immediately if no conversation ID provided
         return config.DEFAULT_TEACHING_MODE
 
+    # Serve the mode from the cache while it is fresh
+    with _teaching_mode_cache_lock:
+        cached = _teaching_mode_cache.get(conversation_id)
+        if cached is not None:
+            if time.monotonic() < cached[1]:
+                return cached[0]
+            # Expired - drop it so stale entries don't hold cache slots
+            _teaching_mode_cache.pop(conversation_id, None)
+
     try:
         # Get the conversation from the database using the provided ID
         conversation = database.get_conversation(conversation_id)
@@ -287,15 +773,23 @@ def get_teaching_mode_from_db(conversation_id: str) -> str:
             # Extract the teaching mode from the conversation record
             teaching_mode = conversation["teaching_mode"]
             # Log successful retrieval for debugging and monitoring
-            logger.info(f"Retrieved teaching mode from database: {teaching_mode}")
+            logger.debug("Retrieved teaching mode from database: %s", teaching_mode)
             # Validate the teaching mode to ensure it's a supported value
-            return validate_teaching_mode(teaching_mode)
+            teaching_mode = validate_teaching_mode(teaching_mode)
+            # Cache only modes read from an existing conversation; misses and errors are retried next time
+            with _teaching_mode_cache_lock:
+                _teaching_mode_cache[conversation_id] = (teaching_mode, time.monotonic() + config.TEACHING_MODE_CACHE_TTL)
+                _teaching_mode_cache.move_to_end(conversation_id)
+                # Entries are kept in expiry order, so the first one is always the closest to expiring
+                if len(_teaching_mode_cache) > config.TEACHING_MODE_CACHE_SIZE:
+                    _teaching_mode_cache.popitem(last=False)
+            return teaching_mode
         else:
             # Conversation exists but has no teaching mode, or conversation doesn't exist
-            logger.warning(f"No teaching mode found for conversation {conversation_id}, using default mode")
+            logger.warning("No teaching mode found for conversation %s, using default mode", conversation_id)
     except Exception as e:
         # Handle any database errors during conversation retrieval
-        logger.error(f"Error getting teaching mode from database: {e}")
+        logger.error("Error getting teaching mode from database: %s", e)
 
     # Return default teaching mode for any error condition or missing data
     return config.DEFAULT_TEACHING_MODE
@@ -7,16 +7,29 @@ a single source of truth for application behavior and external service integrati
 import os
 from typing import Dict, Any, List
 
+from dotenv import load_dotenv
+
+# Load .env.local before any setting below reads the environment
+# Every module imports config first, so values such as the API key are resolved once, at import
+load_dotenv(dotenv_path=".env.local")
+
 # API Configuration for external service integration
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"  # Groq API endpoint for chat completions
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # API key loaded from environment variable for security
 
 # Database Configuration for local data storage
 DB_FILE_NAME = "conversations.db"  # SQLite database filename for conversation persistence
+CONVERSATION_CACHE_SIZE = 32  # Recently used conversations (with messages) kept in memory to skip repeated reads
+
+TEACHING_MODE_CACHE_TTL = 60  # Seconds a conversation's teaching mode is reused before it is read from the database again
+TEACHING_MODE_CACHE_SIZE = 1024  # Conversations whose teaching mode is kept in memory; the oldest entry is dropped past this
 
 # Message Processing Configuration for content management
 MAX_MESSAGE_LENGTH = 50000   # Maximum character length for individual messages to prevent UI/TTS issues
 MAX_CONVERSATION_HISTORY = 15  # Keep last 15 messages + system prompt to stay within API token limits
+MAX_PROMPT_TOKENS = 6000        # Estimated token budget for system prompt + history; older messages are dropped past it
+CHARS_PER_TOKEN = 4             # Rough characters per token used to estimate prompt size without a tokenizer
+MESSAGE_TOKEN_OVERHEAD = 4      # Estimated tokens the API adds around each message (role, separators)
 CONVERSATION_LIST_LIMIT = 20   # Maximum number of conversations to return in list operations
 
 # AI Model Configuration with fallback chain for reliability
@@ -46,15 +59,51 @@ AI_REQUEST_PARAMS = {
 
 # TTS Configuration
 TTS_DEFAULT_VOICE = "Web Voice"
+TTS_CACHE_SIZE = 256  # Maximum number of synthesized utterances kept in memory for reuse
+TTS_MAX_WORKERS = 4  # Threads shared by all sessions for blocking TTS synthesis calls
+
+# Incoming data message limits
+MAX_CONCURRENT_MESSAGES = 4  # Data messages processed at the same time per room
+MAX_PENDING_MESSAGES = 16    # Accepted but unfinished data messages per room; further ones are dropped
 
 # Retry Configuration
 DEFAULT_MAX_RETRIES = 3
 DEFAULT_RETRY_DELAY = 0.5
 
 # AI Request Configuration
-AI_REQUEST_TIMEOUT = (10, 30)  # (connection timeout, read timeout) in seconds
+AI_REQUEST_TIMEOUT = (3, 30)  # (connection timeout, read timeout) in seconds
+GROQ_POOL_CONNECTIONS = 4  # Per-host connection pools kept by the shared Groq session
+GROQ_POOL_MAXSIZE = 16     # Keep-alive connections kept per pool; raise for deployments with many concurrent rooms
 AI_MODEL_RETRY_COUNT = 2  # Number of retries per model
+AI_MODEL_TIME_BUDGET = 45  # Seconds one model may spend on attempts and retry waits before the next model is tried
 AI_MODEL_SWITCH_DELAY = 1.0  # Delay between trying different models
+AI_MODEL_FAILURE_THRESHOLD = 3  # Consecutive timeouts, 503s or connection errors after which a model is skipped
+AI_MODEL_COOLDOWN = 30          # Seconds a failing model is skipped before it is tried again
+AI_PARALLEL_MODELS = 1  # Models asked at once, first success wins; 1 = sequential fallback, higher hedges against a slow model
+AI_HEDGE_DELAY = 0  # Seconds without an answer (or first streamed text) before the next model is also asked; 0 = never hedge
+AI_RESPONSE_CACHE_SIZE = 64  # Answers kept for reuse when the exact same conversation (mode + messages) is asked again; 0 = off
+# Client-side request rate limits per model, in requests per minute
+# Requests wait locally for capacity instead of being sent only to be rejected with a 429
+AI_MODEL_RATE_LIMITS = {
+    "llama-3.3-70b-versatile": 30,
+    "llama-3.1-8b-instant": 30,
+    "llama-3.2-3b-preview": 30
+}
+# Retry backoff per error class as (base, cap) in seconds; each retry waits a random time between 0
+# and min(cap, base * 2 ** attempt) so conversations failing together don't retry in lockstep
+AI_RETRY_BACKOFF = {
+    "timeout": (1, 8),        # Request timed out
+    "rate_limit": (5, 40),    # HTTP 429, needs the longest recovery
+    "unavailable": (3, 24),   # HTTP 503
+    "connection": (1, 8),     # Connection could not be made or was dropped
+    "unexpected": (1, 8)      # Any other error
+}
+
+# Topic Validation Configuration
+TOPIC_VALIDATION_TIMEOUT = (3.05, 10)  # (connection timeout, read timeout) in seconds
+TOPIC_VALIDATION_FAILURE_THRESHOLD = 5  # Consecutive failed validation calls that open the circuit
+TOPIC_VALIDATION_FAILURE_WINDOW = 60    # Seconds within which those failures must happen
+TOPIC_VALIDATION_COOLDOWN = 30          # Seconds validation skips the API once the circuit is open
 
 # Temperature Strategy Explanation:
 # - 70B models: 0.6 (balanced, high quality responses)
@@ -69,7 +118,7 @@ STT_CONFIG = {
 }
 
 # Teaching Modes configuration for AI behavior and response style
-TEACHING_MODES = ["teacher", "qa"]  # Supported modes: "teacher" for structured teaching, "qa" for direct Q&A
+TEACHING_MODES = frozenset({"teacher", "qa"})  # Supported modes: "teacher" for structured teaching, "qa" for direct Q&A
 DEFAULT_TEACHING_MODE = "teacher"   # Default mode for new conversations and fallback scenarios
 
 # Logging Configuration for application monitoring and debugging
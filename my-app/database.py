@@ -1,8 +1,12 @@
 import uuid
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
+import config
+
 # Import database utilities
 from db_utils import (
     get_db_connection,
@@ -15,6 +19,66 @@ from db_utils import (
 
 logger = logging.getLogger("database")
 
+# Recently used conversations with their messages, in least-recently-used order.
+# Reads fill it, writes go to SQLite first and then update or drop the cached copy. Other processes
+# (each LiveKit job runs in its own) write the same database without touching this cache, so every
+# hit is checked against SQLite before it is served. The lock covers access from executor threads.
+_conversation_cache = OrderedDict()
+_conversation_cache_lock = threading.Lock()
+# Bumped on every write, so a read that raced with a write doesn't cache what it loaded
+_conversation_cache_version = 0
+
+
+def _copy_conversation(conversation: Dict[str, Any], last: Optional[int] = None) -> Dict[str, Any]:
+    """Copy a conversation and its messages (only the last `last` when given) so callers can't modify the cached one"""
+    result = dict(conversation)
+    messages = conversation["messages"] if last is None else conversation["messages"][-last:]
+    result["messages"] = [dict(msg) for msg in messages]
+    return result
+
+
+def _cache_get(conversation_id: str, last: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Return a copy of a cached conversation, or None if it isn't cached or is out of date.
+    With `last`, only the newest `last` messages are copied.
+    """
+    # Every write bumps updated_at in the same transaction or deletes the row, so an unchanged
+    # timestamp means no other process changed the conversation; a primary key lookup
+    current = execute_query("SELECT updated_at FROM conversations WHERE id = ?", (conversation_id,), fetch_one=True)
+
+    with _conversation_cache_lock:
+        conversation = _conversation_cache.get(conversation_id)
+        if conversation is None:
+            return None
+        if not current or current["updated_at"] != conversation.get("updated_at"):
+            # Changed or deleted elsewhere - drop it so the caller reloads from SQLite
+            _conversation_cache.pop(conversation_id, None)
+            return None
+        _conversation_cache.move_to_end(conversation_id)
+        return _copy_conversation(conversation, last)
+
+
+def _cache_put(conversation: Dict[str, Any], version: int) -> None:
+    """Cache a copy of a conversation loaded from the database, unless a write happened since version"""
+    with _conversation_cache_lock:
+        if version != _conversation_cache_version:
+            return
+        _conversation_cache[conversation["id"]] = _copy_conversation(conversation)
+        _conversation_cache.move_to_end(conversation["id"])
+        # Evict the least recently used conversation once the cache is full
+        if len(_conversation_cache) > config.CONVERSATION_CACHE_SIZE:
+            _conversation_cache.popitem(last=False)
+
+
+def _cache_invalidate(*conversation_ids: str) -> None:
+    """Drop conversations from the cache after they were changed in the database"""
+    global _conversation_cache_version
+    with _conversation_cache_lock:
+        _conversation_cache_version += 1
+        for conversation_id in conversation_ids:
+            _conversation_cache.pop(conversation_id, None)
+
+
 def migrate_db():
     """Perform database migrations to update schema"""
     conn = get_db_connection()
@@ -114,6 +178,12 @@ def init_db():
         )
         ''')
 
+        # Create index on (conversation_id, timestamp) so a conversation's latest messages are read without a scan
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp
+        ON messages(conversation_id, timestamp)
+        ''')
+
         conn.commit()
         logger.info("Database initialized")
 
@@ -157,33 +227,63 @@ def get_conversation(conversation_id: str, user_id: str = None) -> Optional[Dict
     Get a conversation by ID with optional user_id check for data isolation
     """
     try:
-        # Get the conversation using the utility function
-        conversation = get_record_by_id("conversations", conversation_id)
+        # Serve recently used conversations from memory
+        conversation = _cache_get(conversation_id)
+        cached = conversation is not None
 
-        if not conversation:
-            logger.warning(f"Conversation {conversation_id} not found")
-            return None
+        if not cached:
+            version = _conversation_cache_version
+            # Get the conversation using the utility function
+            conversation = get_record_by_id("conversations", conversation_id)
+
+            if not conversation:
+                logger.warning(f"Conversation {conversation_id} not found")
+                return None
 
         # Check user_id for data isolation if provided
         if user_id and conversation.get("user_id") and conversation.get("user_id") != user_id:
             logger.warning(f"User {user_id} attempted to access conversation {conversation_id} belonging to another user")
             return None  # Don't allow access to another user's conversation
 
-        # Get messages for this conversation
-        messages = execute_query(
-            "SELECT * FROM messages WHERE conversation_id = ? ORDER BY timestamp",
-            (conversation_id,),
-            fetch_all=True
-        )
+        if not cached:
+            # Get messages for this conversation
+            messages = execute_query(
+                "SELECT * FROM messages WHERE conversation_id = ? ORDER BY timestamp",
+                (conversation_id,),
+                fetch_all=True
+            )
 
-        # Add messages to the result
-        conversation["messages"] = messages or []
+            # Add messages to the result
+            conversation["messages"] = messages or []
+            _cache_put(conversation, version)
 
         return conversation
     except Exception as e:
         logger.error(f"Error getting conversation {conversation_id}: {e}")
         raise
 
+def get_recent_messages(conversation_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Get the last `limit` messages of a conversation, oldest first, without loading the whole history.
+    """
+    try:
+        # A cached conversation already has every message in memory; copy only the tail we need
+        cached = _cache_get(conversation_id, last=limit)
+        if cached is not None:
+            return cached["messages"]
+
+        # Read only the newest rows, then put them back in chronological order
+        messages = execute_query(
+            "SELECT * FROM messages WHERE conversation_id = ? ORDER BY timestamp DESC LIMIT ?",
+            (conversation_id, limit),
+            fetch_all=True
+        ) or []
+        messages.reverse()
+        return messages
+    except Exception as e:
+        logger.error(f"Error getting recent messages for conversation {conversation_id}: {e}")
+        raise
+
 def list_conversations(limit: int = 10, offset: int = 0, include_messages: bool = True, user_id: str = None) -> List[Dict[str, Any]]:
     """List conversations with pagination and optional user filtering"""
     try:
@@ -243,10 +343,12 @@ def add_message(conversation_id: str, message_type: str, content: str) -> str:
     """
     Add a new message to an existing conversation and update the conversation timestamp.
     """
+    global _conversation_cache_version
     try:
         # Check if conversation exists before adding message
+        # Always asked of SQLite: another process may have deleted a conversation this one still caches
         conversation = execute_query(
-            "SELECT id FROM conversations WHERE id = ?",  # Query to check conversation existence
+            "SELECT id, updated_at FROM conversations WHERE id = ?",  # Query to check conversation existence
             (conversation_id,),                           # Parameter tuple with conversation ID
             fetch_one=True                               # Return single record or None
         )
@@ -280,6 +382,23 @@ def add_message(conversation_id: str, message_type: str, content: str) -> str:
             # Raise error if transaction failed
             raise RuntimeError(f"Failed to add message to conversation {conversation_id}")
 
+        # Keep a cached copy of the conversation in step with what was just written
+        with _conversation_cache_lock:
+            _conversation_cache_version += 1
+            cached = _conversation_cache.get(conversation_id)
+            if cached is not None and cached.get("updated_at") != conversation["updated_at"]:
+                # The cached copy was already behind another process's writes; appending would hide that
+                _conversation_cache.pop(conversation_id, None)
+            elif cached is not None:
+                cached["messages"].append({
+                    "id": message_id,
+                    "conversation_id": conversation_id,
+                    "type": message_type,
+                    "content": content,
+                    "timestamp": now
+                })
+                cached["updated_at"] = now
+
         # Return the new message ID for use by caller
         return message_id
     except Exception as e:
@@ -322,6 +441,7 @@ def delete_conversation(conversation_id: str, user_id: str = None) -> bool:
         ]
 
         success = execute_transaction(queries)
+        _cache_invalidate(conversation_id)
 
         if success:
             logger.info(f"Deleted conversation {conversation_id} and its messages")
@@ -344,6 +464,7 @@ def update_conversation_title(conversation_id: str, title: str) -> bool:
             (title, now, conversation_id),
             commit=True
         )
+        _cache_invalidate(conversation_id)
 
         logger.info(f"Updated title for conversation {conversation_id}")
         return True
@@ -354,23 +475,28 @@ def update_conversation_title(conversation_id: str, title: str) -> bool:
 def generate_conversation_title(conversation_id: str) -> str:
     """Generate a title for a conversation based on its content"""
     try:
-        # First check if conversation exists
-        conversation = execute_query(
-            "SELECT id FROM conversations WHERE id = ?",
-            (conversation_id,),
-            fetch_one=True
-        )
+        cached = _cache_get(conversation_id)
+        if cached is not None:
+            # The cached messages are already in timestamp order
+            first_message = next((msg for msg in cached["messages"] if msg["type"] == "user"), None)
+        else:
+            # First check if conversation exists
+            conversation = execute_query(
+                "SELECT id FROM conversations WHERE id = ?",
+                (conversation_id,),
+                fetch_one=True
+            )
 
-        if not conversation:
-            logger.warning(f"Cannot generate title: conversation {conversation_id} does not exist")
-            return f"New Conversation {conversation_id[:8]}"
-
-        # Get the first user message
-        first_message = execute_query(
-            "SELECT content FROM messages WHERE conversation_id = ? AND type = 'user' ORDER BY timestamp LIMIT 1",
-            (conversation_id,),
-            fetch_one=True
-        )
+            if not conversation:
+                logger.warning(f"Cannot generate title: conversation {conversation_id} does not exist")
+                return f"New Conversation {conversation_id[:8]}"
+
+            # Get the first user message
+            first_message = execute_query(
+                "SELECT content FROM messages WHERE conversation_id = ? AND type = 'user' ORDER BY timestamp LIMIT 1",
+                (conversation_id,),
+                fetch_one=True
+            )
 
         if not first_message:
             default_title = f"New Conversation {conversation_id[:8]}"
@@ -424,6 +550,7 @@ def reuse_empty_conversation(conversation_id: str, teaching_mode: str = None, li
                 (now, conversation_id),
                 commit=True
             )
+        _cache_invalidate(conversation_id)
 
         # Get the updated conversation list
         conversations = list_conversations(limit=limit, include_messages=False)
@@ -487,7 +614,9 @@ def clear_conversations_by_mode(teaching_mode: str, user_id: str = None) -> Dict
         })
 
         # Execute deletion queries in a transaction
-        if execute_transaction(queries):
+        deleted = execute_transaction(queries)
+        _cache_invalidate(*conversation_ids)
+        if deleted:
             deleted_count = len(conversation_ids)
             logger.info(f"Cleared {deleted_count} conversations with teaching mode: {teaching_mode} for user: {user_id}")
 
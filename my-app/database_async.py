@@ -0,0 +1,41 @@
+"""
+Async access to the database module for code running on the event loop.
+
+Every call runs on one dedicated database thread. The event loop never waits on SQLite, and
+writes from concurrent handlers are applied one after another instead of contending for
+SQLite's write lock.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+# A single worker thread, so calls run in the order they were submitted
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+
+
+async def run(func, *args, **kwargs):
+    """Run a blocking database function on the database thread and return its result"""
+    return await asyncio.get_event_loop().run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def _async(func):
+    """Wrap a database function in a coroutine function that runs it on the database thread"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(func, *args, **kwargs)
+    return wrapper
+
+
+create_conversation = _async(database.create_conversation)
+get_conversation = _async(database.get_conversation)
+get_recent_messages = _async(database.get_recent_messages)
+list_conversations = _async(database.list_conversations)
+add_message = _async(database.add_message)
+delete_conversation = _async(database.delete_conversation)
+update_conversation_title = _async(database.update_conversation_title)
+generate_conversation_title = _async(database.generate_conversation_title)
+reuse_empty_conversation = _async(database.reuse_empty_conversation)
+clear_conversations_by_mode = _async(database.clear_conversations_by_mode)
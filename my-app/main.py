@@ -1,15 +1,19 @@
 import asyncio
+import hashlib
 import json
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-from dotenv import load_dotenv
+import orjson
 from livekit import rtc
-from livekit.agents import JobContext, WorkerOptions, cli, stt, AutoSubscribe, transcription
+from livekit.agents import JobContext, JobProcess, WorkerOptions, cli, stt, AutoSubscribe, transcription
 from livekit.plugins.openai import stt as plugin
 from livekit.plugins import silero
 
 import config
 import database
+import database_async
 import auth_db
 import shutdown
 import ai_utils
@@ -20,8 +24,6 @@ from message_handlers import (
 )
 from text_processor import handle_text_input, generate_fallback_message
 
-load_dotenv(dotenv_path=".env.local")
-
 # Configure detailed logging
 logging.basicConfig(
     level=getattr(logging, config.LOGGING_CONFIG["level"]),
@@ -58,9 +60,24 @@ current_conversation_id = None
 
 # Initialize TTS engine
 tts_engine = None
+# Voice used when a caller doesn't ask for one, resolved from the engine when it is initialized
+tts_default_voice = config.TTS_DEFAULT_VOICE
+
+# Synthesized audio keyed by a hash of (voice, text), kept in least-recently-used order
+tts_cache = OrderedDict()
+
+# Syntheses currently running, keyed like tts_cache, so identical concurrent requests share one engine call
+tts_inflight = {}
 
+# Bounded pool for blocking TTS synthesis so the event loop keeps pumping audio and data meanwhile
+tts_executor = ThreadPoolExecutor(max_workers=config.TTS_MAX_WORKERS, thread_name_prefix="tts")
+# Stop accepting new synthesis work on shutdown without waiting for calls already running
+shutdown.register_shutdown_handler(lambda: tts_executor.shutdown(wait=False))
+# Close the pooled Groq connections on shutdown
+shutdown.register_shutdown_handler(ai_utils.get_session().close)
 
-def find_or_create_empty_conversation(teaching_mode="teacher", check_current=True, user_id=None):
+
+async def find_or_create_empty_conversation(teaching_mode="teacher", check_current=True, user_id=None):
     """
     Find an existing empty conversation or create a new one for the specified user and teaching mode.
     """
@@ -70,7 +87,7 @@ def find_or_create_empty_conversation(teaching_mode="teacher", check_current=Tru
     if check_current and current_conversation_id:
         try:
             # Get the conversation from the database with user_id check for access control
-            conversation = database.get_conversation(current_conversation_id, user_id)
+            conversation = await database_async.get_conversation(current_conversation_id, user_id)
 
             # If the conversation doesn't exist or user doesn't have access, reset current_conversation_id
             if not conversation:
@@ -83,7 +100,7 @@ def find_or_create_empty_conversation(teaching_mode="teacher", check_current=Tru
 
     # Look for empty conversations for this user with matching teaching mode
     empty_conversation_id = None  # Initialize variable to store found empty conversation ID
-    conversations = database.list_conversations(limit=10, user_id=user_id)  # Get recent conversations for this user
+    conversations = await database_async.list_conversations(limit=10, user_id=user_id)  # Get recent conversations for this user
 
     # Iterate through existing conversations to find an empty one with matching teaching mode
     for conv in conversations:
@@ -105,10 +122,12 @@ def find_or_create_empty_conversation(teaching_mode="teacher", check_current=Tru
 
         # Update the conversation with the new teaching mode and refresh timestamp
         try:
-            result = database.reuse_empty_conversation(
+            result = await database_async.reuse_empty_conversation(
                 conversation_id=current_conversation_id,
                 teaching_mode=teaching_mode
             )
+            # The conversation's teaching mode may have changed, so don't serve the cached one
+            ai_utils.invalidate_teaching_mode(current_conversation_id)
             # Check if the reuse operation was successful
             if result and result.get("conversation_id"):
                 logger.info(f"Updated empty conversation with teaching mode: {teaching_mode}")
@@ -126,7 +145,7 @@ def find_or_create_empty_conversation(teaching_mode="teacher", check_current=Tru
         teaching_mode = 'teacher'  # Default to teacher mode if invalid value provided
 
     # Create a new conversation with the specified parameters
-    current_conversation_id = database.create_conversation(
+    current_conversation_id = await database_async.create_conversation(
         title="New Conversation",  # Default title that will be updated when first message is added
         teaching_mode=teaching_mode,  # The validated teaching mode
         user_id=user_id  # User ID for ownership and access control
@@ -136,9 +155,10 @@ def find_or_create_empty_conversation(teaching_mode="teacher", check_current=Tru
     return current_conversation_id  # Return the newly created conversation ID
 
 
-async def send_conversation_data(conversation_id, participant):
+async def send_conversation_data(conversation_id, participant, conversation=None):
     """
     Send updated conversation data to the client through the LiveKit data channel.
+    Pass conversation when the caller already has the up-to-date record to skip reading it again.
     """
     # Validate that we have a valid conversation ID before proceeding
     if not conversation_id:
@@ -146,8 +166,9 @@ async def send_conversation_data(conversation_id, participant):
         return False  # Return immediately if no conversation ID provided
 
     try:
-        # Retrieve the complete conversation data from the database
-        conversation = database.get_conversation(conversation_id)
+        # Retrieve the complete conversation data from the database unless the caller already has it
+        if conversation is None:
+            conversation = await database_async.get_conversation(conversation_id)
 
         # Check if the conversation exists in the database
         if conversation:
@@ -160,33 +181,63 @@ async def send_conversation_data(conversation_id, participant):
 
             # Send the conversation data to the participant using safe retry logic
             # Convert the dictionary to JSON string and then to bytes for transmission
-            await safe_publish_data(participant, json.dumps(conversation_data).encode())
+            await safe_publish_data(participant, orjson.dumps(conversation_data))
             return True  # Indicate successful transmission
     except Exception as e:
         # Log any errors that occur during database retrieval or data preparation
-        logger.error(f"Error sending conversation data: {e}")
+        logger.error("Error sending conversation data: %s", e)
 
     return False  # Return False if conversation not found or any error occurred
 
 
-def initialize_tts():
+async def send_messages_appended(conversation, participant, count):
+    """
+    Send the last `count` messages of a conversation to the client after a turn, instead of the whole conversation.
+    """
+    # Nothing was stored for this turn (for example when the API key is missing)
+    if not conversation:
+        return False
+
+    try:
+        # Only the new messages plus the fields a turn can change; the client appends them to its copy
+        delta = {
+            "type": "messages_appended",                 # Message type for client routing
+            "conversation_id": conversation["id"],       # Conversation the messages belong to
+            "title": conversation.get("title"),          # Generated from the first message, so it may have just changed
+            "updated_at": conversation.get("updated_at"),
+            "messages": conversation["messages"][-count:]  # The messages stored during this turn
+        }
+        await safe_publish_data(participant, orjson.dumps(delta))
+        return True
+    except Exception as e:
+        # Log any errors that occur while preparing or sending the update
+        logger.error("Error sending appended messages: %s", e)
+        return False
+
+
+async def initialize_tts():
     """
     Initialize the Text-to-Speech (TTS) engine and verify its functionality.
     """
-    global tts_engine  # Access the global TTS engine variable
+    global tts_engine, tts_default_voice  # Access the global TTS engine and default voice
 
     try:
         # Initialize with Web TTS implementation
         # WebTTS handles browser-based speech synthesis with fallback mechanisms
         tts_engine = WebTTS()
+        # Resolve the default voice once instead of probing the engine on every synthesis
+        tts_default_voice = getattr(tts_engine, "default_voice_name", config.TTS_DEFAULT_VOICE)
+        # Drop audio produced by any previous engine instance
+        tts_cache.clear()
 
         # Test if the engine is working by synthesizing a short text
-        test_audio = tts_engine.synthesize("Test...")
+        # Use the resolved default voice, the same cache key real syntheses use
+        test_audio = await get_or_synthesize("Test...", voice_name=tts_default_voice)
 
         # Check if test synthesis produced audio data
         if test_audio:
             # Check if the engine is using a fallback mechanism
-            if hasattr(tts_engine, 'use_fallback') and tts_engine.use_fallback:
+            if getattr(tts_engine, 'use_fallback', False):
                 logger.warning("Web TTS engine initialized but using fallback mechanism")
             else:
                 # Engine is fully functional with primary TTS method
@@ -202,9 +253,50 @@ def initialize_tts():
         return False  # Initialization failed
 
 
-async def synthesize_speech(text, room, voice_name=None):
+async def get_or_synthesize(text, voice_name=None):
+    """
+    Synthesize speech for the text, reusing the cached audio when the same text and voice were synthesized before.
+    """
+    # Hash the voice and text so long responses don't become huge dictionary keys
+    cache_key = hashlib.sha256(f"{voice_name}|{text}".encode()).hexdigest()
+
+    # Serve repeated phrases straight from the cache and mark them as recently used
+    audio_data = tts_cache.get(cache_key)
+    if audio_data is not None:
+        tts_cache.move_to_end(cache_key)
+        return audio_data
+
+    # Cache miss - join a synthesis of the same text and voice that is already running, if any
+    pending = tts_inflight.get(cache_key)
+    if pending is None:
+        # Otherwise run the TTS engine on the TTS thread pool
+        pending = asyncio.get_event_loop().run_in_executor(
+            tts_executor, lambda: tts_engine.synthesize(text, voice_name=voice_name)
+        )
+        tts_inflight[cache_key] = pending
+
+        def store_result(future):
+            # Runs on the event loop before any waiter resumes, so no caller can slip in between
+            # the synthesis finishing and its audio reaching the cache
+            tts_inflight.pop(cache_key, None)
+            # Only cache successful results so a failed synthesis is retried next time
+            if future.cancelled() or future.exception() is not None or not future.result():
+                return
+            tts_cache[cache_key] = future.result()
+            # Evict the least recently used entry once the cache is full
+            if len(tts_cache) > config.TTS_CACHE_SIZE:
+                tts_cache.popitem(last=False)
+
+        pending.add_done_callback(store_result)
+
+    # Shield the shared synthesis so one cancelled caller doesn't cancel it for the others
+    return await asyncio.shield(pending)
+
+
+async def synthesize_speech(text, room, voice_name=None, queue=False):
     """
     Synthesize speech from text and send the audio data to all participants in the LiveKit room.
+    With queue=True the client plays it after whatever it is already saying instead of interrupting.
     """
     global tts_engine  # Access the global TTS engine instance
 
@@ -214,7 +306,7 @@ async def synthesize_speech(text, room, voice_name=None):
         Determine which TTS provider is currently being used.
         """
         # Check if engine has fallback attribute and is using fallback mode
-        return "fallback" if hasattr(tts_engine, 'use_fallback') and tts_engine.use_fallback else "web"
+        return "fallback" if getattr(tts_engine, 'use_fallback', False) else "web"
 
     # Helper function to send error message to client
     async def send_error(message):
@@ -228,7 +320,7 @@ async def synthesize_speech(text, room, voice_name=None):
                 "message": message    # Human-readable error description
             }
             # Send error message to all participants in the room
-            await room.local_participant.publish_data(json.dumps(error_message).encode())
+            await room.local_participant.publish_data(orjson.dumps(error_message))
         except Exception as publish_error:
             # Log errors that occur while sending error messages
             logger.error(f"Error sending error message: {publish_error}")
@@ -238,7 +330,7 @@ async def synthesize_speech(text, room, voice_name=None):
     if not tts_engine:
         logger.warning("TTS engine not initialized, attempting to initialize now...")
         # Try to initialize the TTS engine on demand
-        if initialize_tts():
+        if await initialize_tts():
             logger.info("TTS engine initialized successfully on demand")
         else:
             # If initialization fails, send error to client and return
@@ -248,10 +340,11 @@ async def synthesize_speech(text, room, voice_name=None):
     try:
         # Get provider and voice information for status messages
         provider = get_provider_name()  # Determine if using web or fallback TTS
-        # Use provided voice name or fall back to engine default or config default
-        voice = voice_name or (tts_engine.default_voice_name if hasattr(tts_engine, 'default_voice_name') else config.TTS_DEFAULT_VOICE)
+        # Use provided voice name or fall back to the default resolved when the engine was initialized
+        voice = voice_name or tts_default_voice
 
         # Create a data message to notify clients that TTS is starting
+        # It also carries the voice and provider, so no separate voice info message is needed
         tts_start_message = {
             "type": "tts_starting",  # Message type for client TTS state management
             "text": text[:100] + ("..." if len(text) > 100 else ""),  # Truncated text preview for UI
@@ -259,14 +352,15 @@ async def synthesize_speech(text, room, voice_name=None):
             "voice": voice          # Voice name being used for synthesis
         }
         # Send the start notification to all participants
-        await safe_publish_data(room.local_participant, json.dumps(tts_start_message).encode())
+        await safe_publish_data(room.local_participant, orjson.dumps(tts_start_message))
 
         # Log synthesis start with truncated text for debugging
-        logger.info(f"Synthesizing speech with {provider.capitalize()} TTS: {text[:50]}...")
+        logger.info("Synthesizing speech with %s TTS, voice %s: %.50s...", provider, voice, text)
 
-        # Generate audio using TTS engine
+        # Generate audio using TTS engine, reusing cached audio for repeated phrases
         # This is the core synthesis operation that converts text to audio data
-        audio_data = tts_engine.synthesize(text, voice_name=voice_name)
+        # Synthesize with the resolved voice so the status messages name the voice actually used
+        audio_data = await get_or_synthesize(text, voice_name=voice)
 
         # Validate that audio data was successfully generated
         if not audio_data:
@@ -275,17 +369,7 @@ async def synthesize_speech(text, room, voice_name=None):
             return await send_error(config.ERROR_MESSAGES["tts_synthesis_failed"])
 
         # Log successful audio generation with data size for debugging
-        logger.info(f"Audio data generated, size: {len(audio_data)} bytes")
-
-        # Send voice info message to inform clients about the voice being used
-        voice_info = {
-            "type": "voice_info",  # Message type for voice information
-            "voice": voice,        # The actual voice name used
-            "provider": provider   # The TTS provider that generated the audio
-        }
-        # Send voice information to all participants
-        await safe_publish_data(room.local_participant, json.dumps(voice_info).encode())
-        logger.info("Published voice info message")
+        logger.debug("Audio data generated, size: %d bytes", len(audio_data))
 
         # Try to publish the audio data to all participants
         try:
@@ -297,7 +381,11 @@ async def synthesize_speech(text, room, voice_name=None):
 
                 # If it's a web TTS message, publish it as is
                 if message.get('type') == 'web_tts':
-                    logger.info(f"Publishing web TTS message for text: {message.get('text', '')[:50]}...")
+                    logger.debug("Publishing web TTS message for text: %.50s...", message.get('text', ''))
+                    if queue:
+                        # Flag the message so the client queues it; the cached bytes stay unflagged
+                        message["queue"] = True
+                        audio_data = orjson.dumps(message)
                     # Send the JSON message directly to the client
                     await safe_publish_data(room.local_participant, audio_data)
                 else:
@@ -310,10 +398,10 @@ async def synthesize_speech(text, room, voice_name=None):
                 await safe_publish_data(room.local_participant, audio_data)
 
             # Log successful audio data publishing with size for debugging
-            logger.info(f"Published audio data, size: {len(audio_data)} bytes")
+            logger.debug("Published audio data, size: %d bytes", len(audio_data))
         except Exception as e:
             # Handle any errors during audio data publishing
-            logger.error(f"Error publishing audio data: {e}")
+            logger.error("Error publishing audio data: %s", e)
             # Send error message to client with specific error details
             return await send_error(f"Error publishing audio: {str(e)}")
 
@@ -324,20 +412,87 @@ async def synthesize_speech(text, room, voice_name=None):
             "voice": voice          # Voice that was used for synthesis
         }
         # Send completion notification to all participants
-        await safe_publish_data(room.local_participant, json.dumps(tts_complete_message).encode())
+        await safe_publish_data(room.local_participant, orjson.dumps(tts_complete_message))
 
         # Log successful completion of the entire synthesis pipeline
-        logger.info("Speech synthesis and transmission complete")
+        logger.debug("Speech synthesis and transmission complete")
         return True  # Indicate successful completion
     except Exception as e:
         # Handle any unexpected errors in the synthesis pipeline
-        logger.error(f"Error in speech synthesis: {e}")
+        logger.error("Error in speech synthesis: %s", e)
         # Send error message to client with error details
         return await send_error(f"Speech synthesis error: {str(e)}")
 
-def generate_ai_response(text, conversation_id=None):
+def start_streaming_speech(room, voice_name=None):
+    """
+    Speak a response paragraph by paragraph while the model is still generating it.
+
+    Returns (on_delta, finish). on_delta is passed to generate_ai_response and may be called from any thread;
+    finish(final_text) speaks whatever is left and waits until every part has been published.
+    """
+    loop = asyncio.get_event_loop()
+    segments = asyncio.Queue()  # Speakable parts waiting for TTS, in order; None stops the worker
+    streamed = []  # Every delta received, joined once when the answer is complete
+    segmenter = ai_utils.SpeechSegmenter()  # Finds the parts that can be spoken while streaming continues
+    worker = None  # Task speaking the queued parts, started with the first one
+
+    async def speak_segments():
+        # A single worker keeps the parts in order; only the first one interrupts earlier speech
+        first = True
+        while True:
+            segment = await segments.get()
+            if segment is None:
+                return
+            await synthesize_speech(segment, room, voice_name, queue=not first)
+            first = False
+
+    def add_delta(delta):
+        # Runs on the event loop: queue everything up to the last safe paragraph break
+        nonlocal worker
+        streamed.append(delta)
+        segment = segmenter.feed(delta)
+        if segment:
+            if segment.strip():
+                segments.put_nowait(segment)
+                if worker is None:
+                    worker = asyncio.create_task(speak_segments())
+
+    def on_delta(delta):
+        # Called from the executor thread running the model request
+        loop.call_soon_threadsafe(add_delta, delta)
+
+    async def finish(final_text):
+        if "".join(streamed).strip() == final_text:
+            # The streamed text is the final answer: speak the tail that never reached a paragraph break
+            rest = segmenter.rest()
+            if worker is None:
+                await synthesize_speech(rest, room, voice_name)
+                return
+            if rest.strip():
+                segments.put_nowait(rest)
+            segments.put_nowait(None)
+            await worker
+            return
+
+        # Nothing was streamed, or the final answer differs from it (model fallback, error message):
+        # drop the queued parts and speak the whole answer, which interrupts anything still playing
+        if worker is not None:
+            while not segments.empty():
+                segments.get_nowait()
+            segments.put_nowait(None)
+            await worker
+        await synthesize_speech(final_text, room, voice_name)
+
+    return on_delta, finish
+
+
+async def generate_ai_response(text, conversation_id=None, on_delta=None):
     """
     Generate an AI response using the Groq API with multiple model fallback support.
+    When on_delta is given the response text is streamed to it while it is generated.
+
+    Returns (ai_response, conversation), where conversation is the updated record including the new
+    messages, or None when no response was generated.
     """
     global current_conversation_id  # Access global conversation tracking variable
 
@@ -346,7 +501,7 @@ def generate_ai_response(text, conversation_id=None):
         # Check if we have a current conversation, create one if not
         if current_conversation_id is None:
             # Create a new conversation with default title and settings
-            current_conversation_id = database.create_conversation(config.DEFAULT_CONVERSATION_TITLE)
+            current_conversation_id = await database_async.create_conversation(config.DEFAULT_CONVERSATION_TITLE)
         conversation_id = current_conversation_id  # Use the current conversation
 
     # Validate that the Groq API key is configured
@@ -355,39 +510,42 @@ def generate_ai_response(text, conversation_id=None):
         # Get the configured error message for missing API key
         error_msg = config.ERROR_MESSAGES["api_key_missing"]
         # Store the error message in the conversation for user visibility
-        database.add_message(conversation_id, "ai", error_msg)
-        return error_msg  # Return error message to display to user
+        await database_async.add_message(conversation_id, "ai", error_msg)
+        return error_msg, None  # Return error message to display to user
 
     # Extract conversation context from the conversation_id parameter
     actual_conversation_id, teaching_mode, is_hidden = ai_utils.extract_conversation_context(conversation_id)
 
     # Add user message to database only if it's not a hidden instruction
     if not is_hidden:
-        database.add_message(actual_conversation_id, "user", text)
+        await database_async.add_message(actual_conversation_id, "user", text)
 
-    # Get conversation history from database including all messages and metadata
-    conversation = database.get_conversation(actual_conversation_id)
+    # Get only the messages the model will see; older history never leaves the database
+    messages = await database_async.get_recent_messages(actual_conversation_id, config.MAX_CONVERSATION_HISTORY)
 
     # Generate a title for the conversation based on the first message
-    if len(conversation.get("messages", [])) <= 1:
-        database.generate_conversation_title(actual_conversation_id)
-        logger.info(f"Generated title for conversation {actual_conversation_id}")
+    if len(messages) <= 1:
+        await database_async.generate_conversation_title(actual_conversation_id)
+        logger.info("Generated title for conversation %s", actual_conversation_id)
 
     # Prepare conversation history for the AI model
-    conversation_history = ai_utils.prepare_conversation_history(conversation["messages"], teaching_mode)
+    conversation_history = ai_utils.prepare_conversation_history(messages, teaching_mode)
 
     # Generate AI response using multiple models with fallback logic
-    ai_response = ai_utils.generate_ai_response_with_models(conversation_history)
+    # The HTTP requests run on executor threads so LiveKit audio and data keep flowing meanwhile
+    ai_response = await ai_utils.generate_ai_response_with_models_async(conversation_history, on_delta)
 
     # Store the response in the database for conversation persistence
-    database.add_message(actual_conversation_id, "ai", ai_response)
+    await database_async.add_message(actual_conversation_id, "ai", ai_response)
+    # Re-read the conversation with the new messages; this is served from the conversation cache
+    conversation = await database_async.get_conversation(actual_conversation_id)
 
     # Log response length for debugging and monitoring
     if ai_utils.should_split_response(ai_response):
-        logger.info(f"Response is long ({len(ai_response)} chars), but not splitting to avoid TTS and UI issues")
+        logger.debug("Response is long (%d chars), but not splitting to avoid TTS and UI issues", len(ai_response))
 
     logger.info("Successfully generated AI response")
-    return ai_response  # Return the generated response
+    return ai_response, conversation  # Return the generated response and the updated conversation
 
 async def _forward_transcription(
     stt_stream: stt.SpeechStream, stt_forwarder: transcription.STTSegmentsForwarder, room: rtc.Room
@@ -411,17 +569,17 @@ async def _forward_transcription(
             # you may not want to log interim transcripts, they are not final and may be incorrect
             # Extract the most likely transcription alternative from the event
             interim_text = ev.alternatives[0].text  # Get the best guess transcription
-            logger.debug(f" -> {interim_text}")  # Log interim result with arrow indicator
+            logger.debug(" -> %s", interim_text)  # Log interim result with arrow indicator
 
         # Handle final transcription results (complete, accurate speech recognition)
         elif ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
             # Extract the final transcribed text from the best alternative
             transcribed_text = ev.alternatives[0].text  # Get the final, accurate transcription
-            logger.debug(f" ~> {transcribed_text}")  # Log final result with different indicator
+            logger.debug(" ~> %s", transcribed_text)  # Log final result with different indicator
 
             # Get the teaching mode from the database for the current conversation
-            teaching_mode = ai_utils.get_teaching_mode_from_db(current_conversation_id)
-            logger.info(f"Using teaching mode for voice input: {teaching_mode}")
+            teaching_mode = await database_async.run(ai_utils.get_teaching_mode_from_db, current_conversation_id)
+            logger.debug("Using teaching mode for voice input: %s", teaching_mode)
 
             # Create a context object with conversation ID, teaching mode, and is_hidden flag
             context = {
@@ -430,18 +588,25 @@ async def _forward_transcription(
                 "is_hidden": False  # Voice inputs are never hidden instructions (always visible in chat)
             }
 
+            # Start speaking paragraphs as soon as the model produces them
+            on_delta, finish_speech = start_streaming_speech(room)
+
             # Generate AI response using the current conversation and teaching mode
             # Pass the transcribed speech and context to the AI response generator
-            ai_response = generate_ai_response(transcribed_text, context)
+            ai_response, conversation = await generate_ai_response(transcribed_text, context, on_delta)
 
             # Check if the response is empty or just whitespace
             if not ai_response or not ai_response.strip():
                 logger.warning("Received empty AI response for voice input, using fallback message")
                 # Use fallback message generator to provide a helpful response
-                ai_response = generate_fallback_message(transcribed_text)
+                ai_response = generate_fallback_message()
 
             # Log the AI response for debugging and monitoring
-            logger.info(f"AI Response: {ai_response}")
+            logger.debug("AI Response: %s", ai_response)
+
+            # Speak whatever part of the response hasn't been spoken while it was streaming
+            # Start it before publishing the text so speech doesn't wait on the text round trip
+            speech = asyncio.create_task(finish_speech(ai_response))
 
             # Send the response as a single message (multi-part processing disabled)
             if current_conversation_id:
@@ -450,24 +615,25 @@ async def _forward_transcription(
                 data_message = {
                     "type": "ai_response",                      # Message type for client routing
                     "text": ai_response,                        # The generated AI response text
-                    "conversation_id": current_conversation_id  # Associated conversation ID
+                    "conversation_id": current_conversation_id, # Associated conversation ID
+                    "speech_streamed": True                     # Speech is sent separately, the client shouldn't auto-speak it
                 }
                 # Use our safe publish method with retry logic for reliable delivery
-                await safe_publish_data(room.local_participant, json.dumps(data_message).encode())
+                await safe_publish_data(room.local_participant, orjson.dumps(data_message))
             else:
                 # Log an error if we don't have a valid conversation ID
                 logger.error(config.ERROR_MESSAGES["no_conversation_id"])
 
-            # Synthesize speech from the AI response to provide audio feedback
-            await synthesize_speech(ai_response, room)
+            # Wait for the remaining speech to be published
+            await speech
 
-            # Send updated conversation data to ensure UI is in sync
-            await send_conversation_data(current_conversation_id, room.local_participant)
+            # Send the user and AI messages stored this turn so the UI stays in sync
+            await send_messages_appended(conversation, room.local_participant, 2)
 
         # Handle speech recognition usage metrics and statistics
         elif ev.type == stt.SpeechEventType.RECOGNITION_USAGE:
             # Log usage metrics for monitoring and debugging speech recognition performance
-            logger.debug(f"metrics: {ev.recognition_usage}")
+            logger.debug("metrics: %s", ev.recognition_usage)
 
         # Forward the transcription event to connected clients for real-time display
         stt_forwarder.update(ev)
@@ -491,17 +657,29 @@ async def safe_publish_data(participant, data, max_retries=config.DEFAULT_MAX_RE
             if attempt < max_retries - 1:
                 # Not the last attempt, so retry after a delay
                 backoff_delay = retry_delay * (2 ** attempt)  # Exponential backoff: 0.5s, 1s, 2s, 4s...
-                logger.warning(f"Publish attempt {attempt+1} failed with {error_type}: {str(e)}. Retrying in {backoff_delay}s...")
+                logger.warning("Publish attempt %d failed with %s: %s. Retrying in %ss...", attempt + 1, error_type, e, backoff_delay)
                 # Wait for the calculated delay before next attempt
                 await asyncio.sleep(backoff_delay)  # Async sleep to not block other operations
             else:
                 # Last attempt failed - log error and give up
-                logger.error(f"Failed to publish data after {max_retries} attempts. Last error: {error_type}: {str(e)}")
+                logger.error("Failed to publish data after %d attempts. Last error: %s: %s", max_retries, error_type, e)
                 return False  # All retries exhausted, return failure
 
     # This line should never be reached due to the logic above, but included for safety
     return False  # Fallback return for any unexpected code path
 
+def prewarm(proc: JobProcess):
+    """
+    Load the Silero VAD model once per worker process, before any job is assigned to it.
+    """
+    # Jobs run in reused worker processes, so every room handled here shares this one model
+    proc.userdata["vad"] = silero.VAD.load(
+        min_silence_duration=config.STT_CONFIG["min_silence_duration"],      # Minimum silence to end speech
+        min_speech_duration=config.STT_CONFIG["min_speech_duration"],        # Minimum speech duration to process
+        prefix_padding_duration=config.STT_CONFIG["prefix_padding_duration"] # Padding before speech starts
+    )
+
+
 async def entrypoint(ctx: JobContext):
     """
     Main entry point for the LiveKit agent that sets up speech-to-text, message handling, and room connections.
@@ -512,15 +690,25 @@ async def entrypoint(ctx: JobContext):
     # Use the global current_conversation_id - it's already initialized as None
     global current_conversation_id
 
-    # Initialize TTS engine and verify it's working properly
-    if initialize_tts():
+    # The Silero VAD model was loaded once for this worker process by prewarm; both STT set-ups below share it
+    vad = ctx.proc.userdata["vad"]
+
+    # Warm everything else the first utterance needs at the same time: the TTS engine and its probe,
+    # and a keep-alive connection to the Groq API
+    warm_ups = [initialize_tts()]
+    if config.GROQ_API_KEY:
+        warm_ups.append(asyncio.get_event_loop().run_in_executor(None, ai_utils.warm_up_connection))
+    tts_ready, *_ = await asyncio.gather(*warm_ups)
+
+    # Report whether the TTS engine is working properly
+    if tts_ready:
         logger.info("TTS engine initialization successful")  # TTS is ready for use
     else:
         # Log warning but continue - TTS failure shouldn't stop the service
         logger.warning(config.ERROR_MESSAGES["tts_init_failed"])
 
     # Check if there are any existing conversations in the database
-    conversations = database.list_conversations(limit=1)  # Get the most recent conversation
+    conversations = await database_async.list_conversations(limit=1)  # Get the most recent conversation
     if conversations:
         # Use the most recent conversation to maintain context
         current_conversation_id = conversations[0]["id"]  # Extract conversation UUID
@@ -540,11 +728,7 @@ async def entrypoint(ctx: JobContext):
         # Create a local speech-to-text implementation with voice activity detection
         stt_impl = stt.StreamAdapter(
             stt=stt.STT.with_default(),  # Use default local STT implementation
-            vad=silero.VAD.load(         # Load Silero Voice Activity Detection model
-                min_silence_duration=config.STT_CONFIG["min_silence_duration"],      # Minimum silence to end speech
-                min_speech_duration=config.STT_CONFIG["min_speech_duration"],        # Minimum speech duration to process
-                prefix_padding_duration=config.STT_CONFIG["prefix_padding_duration"] # Padding before speech starts
-            ),
+            vad=vad,                     # Silero Voice Activity Detection model loaded by prewarm
         )
 
     # Check if the STT implementation supports streaming and wrap if necessary
@@ -552,93 +736,101 @@ async def entrypoint(ctx: JobContext):
         # wrap with a stream adapter to use streaming semantics for real-time transcription
         stt_impl = stt.StreamAdapter(
             stt=stt_impl,                # The base STT implementation to wrap
-            vad=silero.VAD.load(         # Voice Activity Detection for stream processing
-                min_silence_duration=config.STT_CONFIG["min_silence_duration"],      # Silence threshold for speech end
-                min_speech_duration=config.STT_CONFIG["min_speech_duration"],        # Minimum speech duration to process
-                prefix_padding_duration=config.STT_CONFIG["prefix_padding_duration"] # Audio padding before speech
-            ),
+            vad=vad,                     # Voice Activity Detection for stream processing
         )
 
-    # Handler for text input messages from clients
+    # Message handlers keyed by message type
+    # Each takes the parsed message and returns the conversation that becomes current, or None to keep it
+    async def _h_clear(message):
+        # Clear conversations and switch to the replacement conversation
+        return await handle_clear_conversations(message, ctx, current_conversation_id, safe_publish_data)
+
+    async def _h_rename(message):
+        # Rename a specific conversation with a new title
+        await handle_rename_conversation(message, ctx, safe_publish_data)
+
+    async def _h_delete(message):
+        # Delete a conversation; a replacement is returned only if the current one was deleted
+        return await handle_delete_conversation(message, ctx, current_conversation_id, safe_publish_data)
+
+    async def _h_list(message):
+        # Send the list of conversations to the client
+        await handle_list_conversations(message, ctx, safe_publish_data)
+
+    async def _h_auth(message):
+        # Process authentication and get response data
+        response_data = await handle_auth_request(message, ctx, safe_publish_data)
+        # After a successful login, find or create a conversation for the user
+        if response_data.get('success') and message.get('data', {}).get('type') == 'login':
+            # Extract user ID from successful login response
+            user_id = response_data.get('user', {}).get('id')
+            if user_id:  # If we have a valid user ID, create/find a conversation
+                return await find_or_create_empty_conversation(
+                    teaching_mode='teacher',  # Default to teacher mode for new users
+                    check_current=True,       # Validate current conversation
+                    user_id=user_id          # Associate with the logged-in user
+                )
+
+    async def _h_get(message):
+        # Send a specific conversation to the client; it becomes current if it was found
+        return await handle_get_conversation(message, ctx, safe_publish_data)
+
+    async def _h_new(message):
+        # Create a new conversation and make it the current one
+        return await handle_new_conversation(message, ctx, safe_publish_data, find_or_create_empty_conversation)
+
+    async def _h_text_input(message):
+        # Process user text input through the complete AI pipeline
+        return await handle_text_input(
+            message, ctx, current_conversation_id, safe_publish_data,  # Basic parameters
+            find_or_create_empty_conversation, generate_ai_response,   # Conversation and AI functions
+            synthesize_speech, send_conversation_data,                 # Audio and data sync functions
+            start_streaming_speech, send_messages_appended             # Streamed speech and per-turn sync
+        )
+
+    _HANDLERS = {
+        'clear_all_conversations': _h_clear,  # Delete all conversations of a specific mode
+        'rename_conversation': _h_rename,
+        'delete_conversation': _h_delete,
+        'list_conversations': _h_list,
+        'auth_request': _h_auth,              # Login, register, verify, logout
+        'get_conversation': _h_get,
+        'new_conversation': _h_new,
+        'text_input': _h_text_input,          # The main interaction type
+    }
+
     async def process_text_input(data: rtc.DataPacket):
         """
         Process incoming data packets from clients and route them to appropriate message handlers.
         """
-        # Declare global variable at the beginning of the function for conversation tracking
         global current_conversation_id
         try:
-            # Decode the incoming data packet from bytes to string
-            message_str = data.data.decode('utf-8')  # Convert bytes to UTF-8 string
             # Parse the JSON message from the client
-            message = json.loads(message_str)        # Convert JSON string to Python dictionary
-
-            # Route messages to appropriate handlers based on message type
-            # Extract the message type to determine which handler to use
-            message_type = message.get('type')       # Get the 'type' field from message dictionary
-
-            # Handle conversation clearing requests (delete all conversations of a specific mode)
-            if message_type == 'clear_all_conversations':
-                # Clear conversations and get the new conversation ID
-                current_conversation_id = await handle_clear_conversations(message, ctx, current_conversation_id, safe_publish_data)
-
-            # Handle conversation renaming requests
-            elif message_type == 'rename_conversation':
-                # Rename a specific conversation with a new title
-                await handle_rename_conversation(message, ctx, safe_publish_data)
-
-            # Handle conversation deletion requests
-            elif message_type == 'delete_conversation':
-                # Delete a conversation and potentially get a new current conversation
-                new_id = await handle_delete_conversation(message, ctx, current_conversation_id, safe_publish_data)
-                if new_id:  # Update current conversation if a new one was created
-                    current_conversation_id = new_id
-
-            # Handle requests to list all conversations
-            elif message_type == 'list_conversations':
-                # Send the list of conversations to the client
-                await handle_list_conversations(message, ctx, safe_publish_data)
-
-            # Handle authentication requests (login, register, verify, logout)
-            elif message_type == 'auth_request':
-                # Process authentication and get response data
-                response_data = await handle_auth_request(message, ctx, safe_publish_data)
-                # Update current conversation if login was successful
-                # Check if this was a successful login operation
-                if response_data.get('success') and message.get('data', {}).get('type') == 'login':
-                    # Extract user ID from successful login response
-                    user_id = response_data.get('user', {}).get('id')
-                    if user_id:  # If we have a valid user ID, create/find a conversation
-                        # Find or create an empty conversation for the newly logged-in user
-                        current_conversation_id = find_or_create_empty_conversation(
-                            teaching_mode='teacher',  # Default to teacher mode for new users
-                            check_current=True,       # Validate current conversation
-                            user_id=user_id          # Associate with the logged-in user
-                        )
-
-            # Handle requests to get a specific conversation
-            elif message_type == 'get_conversation':
-                # Retrieve and send a specific conversation to the client
-                conversation_id = await handle_get_conversation(message, ctx, safe_publish_data)
-                if conversation_id:  # Update current conversation if retrieval was successful
-                    current_conversation_id = conversation_id
-
-            # Handle requests to create a new conversation
-            elif message_type == 'new_conversation':
-                # Create a new conversation and make it the current one
-                current_conversation_id = await handle_new_conversation(message, ctx, safe_publish_data, find_or_create_empty_conversation)
-
-            # Handle text input for AI processing (the main interaction type)
-            elif message_type == 'text_input':
-                # Process user text input through the complete AI pipeline
-                current_conversation_id = await handle_text_input(
-                    message, ctx, current_conversation_id, safe_publish_data,  # Basic parameters
-                    find_or_create_empty_conversation, generate_ai_response,   # Conversation and AI functions
-                    synthesize_speech, send_conversation_data                  # Audio and data sync functions
-                )
+            message = json.loads(data.data.decode('utf-8'))
+
+            # Route the message to its handler by type; unknown types are ignored
+            handler = _HANDLERS.get(message.get('type'))
+            if handler:
+                new_conversation_id = await handler(message)
+                # Switch the current conversation if the handler picked one
+                if new_conversation_id:
+                    current_conversation_id = new_conversation_id
         except Exception as e:
             # Log any errors that occur during message processing
             # This prevents one bad message from crashing the entire service
-            logger.error(f"Error handling data message: {e}")
+            logger.error("Error handling data message: %s", e)
+
+    # Messages accepted but not finished yet; holding the tasks also keeps them from being garbage collected
+    pending_messages = set()
+    # Limits how many messages are processed at once, each of which may start AI and TTS requests
+    message_slots = asyncio.Semaphore(config.MAX_CONCURRENT_MESSAGES)
+
+    async def process_text_input_limited(data: rtc.DataPacket):
+        """
+        Process a data packet once one of the concurrent processing slots is free.
+        """
+        async with message_slots:
+            await process_text_input(data)
 
     # Non-async wrapper for the data received event
     # LiveKit event handlers must be synchronous, so we need a wrapper for our async function
@@ -646,9 +838,16 @@ async def entrypoint(ctx: JobContext):
         """
         Synchronous wrapper for handling incoming data packets from clients.
         """
+        # Drop packets from a burst rather than queueing work without bound
+        if len(pending_messages) >= config.MAX_PENDING_MESSAGES:
+            logger.warning("Dropping data message: %d messages are already pending", len(pending_messages))
+            return
+
         # Create a task to process the data asynchronously without blocking the event handler
         # This allows the LiveKit event system to continue processing other events
-        asyncio.create_task(process_text_input(data))
+        task = asyncio.create_task(process_text_input_limited(data))
+        pending_messages.add(task)
+        task.add_done_callback(pending_messages.discard)
 
     # Async function to handle audio track transcription
     async def transcribe_track(participant: rtc.RemoteParticipant, track: rtc.Track):
@@ -703,4 +902,5 @@ if __name__ == "__main__":
     """
     # Start the LiveKit agent application with our entrypoint function
     # cli.run_app() handles the LiveKit agent lifecycle and connection management
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))  # Pass our entrypoint function to the LiveKit CLI
+    # prewarm loads the VAD model when a worker process starts instead of during a job
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
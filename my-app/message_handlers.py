@@ -4,8 +4,9 @@ Message handlers for processing different types of client messages.
 
 import json
 import logging
+import orjson
 import config
-import database
+import database_async
 import auth_api
 
 logger = logging.getLogger("message-handlers")
@@ -26,7 +27,7 @@ async def handle_clear_conversations(message, ctx, current_conversation_id, safe
 
     # Clear conversations for the specified teaching mode with user_id
     # This database operation deletes matching conversations and creates a new one
-    result = database.clear_conversations_by_mode(teaching_mode, user_id)
+    result = await database_async.clear_conversations_by_mode(teaching_mode, user_id)
     # Extract the number of conversations that were deleted
     deleted_count = result["deleted_count"]
     # Extract the ID of the newly created conversation
@@ -44,19 +45,19 @@ async def handle_clear_conversations(message, ctx, current_conversation_id, safe
         "deleted_count": deleted_count          # Number of conversations that were deleted
     }
     # Send the response message to the client using safe transmission
-    await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+    await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
     # Also send updated conversation list to refresh the client UI
     try:
         # Retrieve the updated list of conversations for this user
-        conversations = database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
+        conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
         # Create response message with the updated conversation list
         list_response = {
             "type": "conversations_list",  # Message type for client list handling
             "conversations": conversations  # Updated list of conversations
         }
         # Send the updated conversation list to the client
-        await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+        await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
     except Exception as e:
         # Log any errors during conversation list retrieval
         logger.error(f"Error getting conversation list after clearing: {e}")
@@ -78,7 +79,7 @@ async def handle_rename_conversation(message, ctx, safe_publish_data):
     # Validate that we have both required fields before proceeding
     if conversation_id and new_title:
         # Attempt to update the conversation title in the database
-        success = database.update_conversation_title(conversation_id, new_title)
+        success = await database_async.update_conversation_title(conversation_id, new_title)
 
         # Check if the database update was successful
         if success:
@@ -89,19 +90,19 @@ async def handle_rename_conversation(message, ctx, safe_publish_data):
                 "title": new_title               # The new title that was applied
             }
             # Send the rename confirmation to the client
-            await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
             # Send updated conversation list immediately after rename
             try:
                 # Retrieve the updated conversation list for this user
-                conversations = database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
+                conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
                 # Create response message with the updated conversation list
                 list_response = {
                     "type": "conversations_list",  # Message type for client list handling
                     "conversations": conversations  # Updated list with new title
                 }
                 # Send the updated conversation list to the client
-                await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+                await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
             except Exception as e:
                 # Log any errors during conversation list retrieval
                 logger.error(f"Error getting conversation list after rename: {e}")
@@ -120,14 +121,14 @@ async def handle_delete_conversation(message, ctx, current_conversation_id, safe
     # Validate that we have a conversation ID to delete
     if conversation_id:
         # Pass user_id for data isolation - users can only delete their own conversations
-        success = database.delete_conversation(conversation_id, user_id)
+        success = await database_async.delete_conversation(conversation_id, user_id)
 
         # Check if the deletion was successful
         if success:
             # If we deleted the current conversation, create a new one
             if current_conversation_id == conversation_id:
                 # Create a new conversation with default settings to replace the deleted one
-                new_conversation_id = database.create_conversation(
+                new_conversation_id = await database_async.create_conversation(
                     title=config.DEFAULT_CONVERSATION_TITLE,  # Default title for new conversation
                     teaching_mode=config.DEFAULT_TEACHING_MODE,  # Default teaching mode
                     user_id=user_id                          # Associate with the same user
@@ -142,19 +143,19 @@ async def handle_delete_conversation(message, ctx, current_conversation_id, safe
                 "new_conversation_id": new_conversation_id  # ID of replacement conversation (if any)
             }
             # Send the deletion confirmation to the client
-            await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
             # Send updated conversation list immediately after deletion
             try:
                 # Retrieve the updated conversation list for this user
-                conversations = database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
+                conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
                 # Create response message with the updated conversation list
                 list_response = {
                     "type": "conversations_list",  # Message type for client list handling
                     "conversations": conversations  # Updated list without the deleted conversation
                 }
                 # Send the updated conversation list to the client
-                await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+                await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
             except Exception as e:
                 # Log any errors during conversation list retrieval
                 logger.error(f"Error getting conversation list after deletion: {e}")
@@ -175,7 +176,7 @@ async def handle_list_conversations(message, ctx, safe_publish_data):
 
     # Retrieve conversations from database with user filtering
     # If user_id is None, this will return conversations without user association 
-    conversations = database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
+    conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
 
     # Create response message with the conversation list
     response_message = {
@@ -183,7 +184,7 @@ async def handle_list_conversations(message, ctx, safe_publish_data):
         "conversations": conversations  # List of conversation objects for this user
     }
     # Send the conversation list to the client
-    await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+    await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
 async def handle_auth_request(message, ctx, safe_publish_data):
     """
@@ -194,7 +195,7 @@ async def handle_auth_request(message, ctx, safe_publish_data):
 
     # Process the authentication request using the new auth_api module
     # Convert auth_data to JSON bytes as expected by the auth_api
-    response_data, status_code = auth_api.handle_auth_request(json.dumps(auth_data).encode())
+    response_data, status_code = await database_async.run(auth_api.handle_auth_request, json.dumps(auth_data).encode())
 
     # Create a response message with the authentication result
     response_message = {
@@ -204,7 +205,7 @@ async def handle_auth_request(message, ctx, safe_publish_data):
     }
 
     # Send the response back to the client
-    await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+    await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
     # If this was a successful login, send the conversation list to initialize the session
     if (auth_data.get('type') == 'login' and response_data.get('success') and
@@ -213,14 +214,14 @@ async def handle_auth_request(message, ctx, safe_publish_data):
         user_id = response_data['user']['id']
         try:
             # Retrieve the conversation list for the newly logged-in user
-            conversations = database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
+            conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
             # Create response message with the user's conversation list
             list_response = {
                 "type": "conversations_list",  # Message type for client list handling
                 "conversations": conversations  # User's conversations for session initialization
             }
             # Send the conversation list to initialize the user's session
-            await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
         except Exception as e:
             # Log any errors during conversation list retrieval after login
             logger.error(f"Error getting conversation list after login: {e}")
@@ -240,7 +241,7 @@ async def handle_get_conversation(message, ctx, safe_publish_data):
     # Validate that we have a conversation ID to look up
     if conversation_id:
         # Get the conversation with user_id check for data isolation. can only access conversations they own
-        conversation = database.get_conversation(conversation_id, user_id)
+        conversation = await database_async.get_conversation(conversation_id, user_id)
 
         # Check if the conversation was found and is accessible
         if conversation:
@@ -250,7 +251,7 @@ async def handle_get_conversation(message, ctx, safe_publish_data):
                 "conversation": conversation  # Complete conversation object with messages
             }
             # Send the conversation data to the client
-            await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
             # Return the conversation ID to indicate successful retrieval
             return conversation_id
         else:
@@ -261,7 +262,7 @@ async def handle_get_conversation(message, ctx, safe_publish_data):
                 "message": "Conversation not found or you don't have access to it"  # User-friendly message
             }
             # Send the error message to the client
-            await safe_publish_data(ctx.room.local_participant, json.dumps(error_message).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(error_message))
 
     # Return None to indicate no conversation was retrieved
     return None
@@ -276,7 +277,7 @@ async def handle_new_conversation(message, ctx, safe_publish_data, find_or_creat
     user_id = message.get('user_id')
 
     # Find or create an empty conversation using the conversation management function
-    conversation_id = find_or_create_empty_conversation(teaching_mode, user_id=user_id)
+    conversation_id = await find_or_create_empty_conversation(teaching_mode, user_id=user_id)
 
     # Send the new conversation created response first
     response_message = {
@@ -286,19 +287,19 @@ async def handle_new_conversation(message, ctx, safe_publish_data, find_or_creat
         "user_id": user_id                   # The user who owns this conversation
     }
     # Send the new conversation confirmation to the client
-    await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+    await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
     #  send the updated conversation list to refresh the client UI
     try:
         # Retrieve the updated conversation list for this user
-        conversations = database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
+        conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
         # Create response message with the updated conversation list
         list_response = {
             "type": "conversations_list",  # Message type for client list handling
             "conversations": conversations  # Updated list including the new conversation
         }
         # Send the updated conversation list to the client
-        await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+        await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
     except Exception as e:
         # Log any errors during conversation list retrieval
         logger.error(f"Error getting conversation list: {e}")
@@ -2,11 +2,11 @@
 Text input processing module.
 """
 
-import json
 import logging
 import asyncio
+import orjson
 import config
-import database
+import database_async
 import topic_validator
 
 logger = logging.getLogger("text-processor")
@@ -35,7 +35,8 @@ def generate_fallback_message():
 
 async def handle_text_input(message, ctx, current_conversation_id, safe_publish_data,
                            find_or_create_empty_conversation, generate_ai_response,
-                           synthesize_speech, send_conversation_data):
+                           synthesize_speech, send_conversation_data, start_streaming_speech,
+                           send_messages_appended):
     """
     Handle text input messages from clients and orchestrate the complete AI response pipeline.
     Args:
@@ -48,10 +49,12 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
         ctx (JobContext): The LiveKit job context containing room and participant information
         current_conversation_id (str): The ID of the currently active conversation
         safe_publish_data (callable): Async function for safely publishing data to participants
-        find_or_create_empty_conversation (callable): Function to find or create conversations
-        generate_ai_response (callable): Function to generate AI responses
+        find_or_create_empty_conversation (callable): Async function to find or create conversations
+        generate_ai_response (callable): Async function to generate AI responses, returning (response, conversation)
         synthesize_speech (callable): Async function for text-to-speech synthesis
         send_conversation_data (callable): Async function to send conversation data to clients
+        start_streaming_speech (callable): Function returning (on_delta, finish) to speak the response while it streams
+        send_messages_appended (callable): Async function to send the messages stored during a turn to clients
     """
     # Extract the user's text input from the message
     text_input = message.get('text')
@@ -65,21 +68,19 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
         user_id = message.get('user_id')
 
         # Find an existing empty conversation or create a new one
-        current_conversation_id = find_or_create_empty_conversation(teaching_mode, check_current=True, user_id=user_id)
+        current_conversation_id = await find_or_create_empty_conversation(teaching_mode, check_current=True, user_id=user_id)
 
         # Get the updated conversation list asynchronously to send to client
         try:
-            # Run the database query in a thread executor to avoid blocking the event loop
-            conversations = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
-            )
+            # Run the database query on the database thread to avoid blocking the event loop
+            conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
             # Create a response message with the updated conversation list
             list_response = {
                 "type": "conversations_list",  # Message type for client routing
                 "conversations": conversations  # List of conversation objects
             }
             # Send the conversation list to the client
-            await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
         except Exception as e:
             # Log any errors during conversation list retrieval
             logger.error(f"Error getting conversation list: {e}")
@@ -98,7 +99,7 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
             "conversation_id": current_conversation_id  # Associated conversation
         }
         # Send the echo message to the client
-        await safe_publish_data(ctx.room.local_participant, json.dumps(echo_message).encode())
+        await safe_publish_data(ctx.room.local_participant, orjson.dumps(echo_message))
 
     # Get conversation history for topic validation
     # This provides context to help determine if follow-up questions are related to CS topics
@@ -106,9 +107,7 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
     if current_conversation_id:
         try:
             # Retrieve conversation data asynchronously to avoid blocking the event loop
-            conversation = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: database.get_conversation(current_conversation_id)
-            )
+            conversation = await database_async.get_conversation(current_conversation_id)
             # Check if conversation exists and contains messages
             if conversation and 'messages' in conversation:
                 # Get the last 6 messages for context (enough for meaningful validation)
@@ -129,7 +128,10 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
 
     # Validate topic using the topic validator with conversation context
     # This determines if the user's question is related to computer science/programming
-    is_topic_valid, _ = topic_validator.validate_question_topic(text_input, conversation_history)
+    # The validation calls the Groq API, so run it in a thread to keep the event loop serving audio and data
+    is_topic_valid, _ = await asyncio.get_event_loop().run_in_executor(
+        None, topic_validator.validate_question_topic, text_input, conversation_history
+    )
 
     # Handle topic rejection if the question is not CS/programming related
     if not is_topic_valid:
@@ -144,7 +146,7 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
             "topic_rejected": True              # Flag indicating this was a topic rejection
         }
         # Send the rejection message to the client
-        await safe_publish_data(ctx.room.local_participant, json.dumps(rejection_message).encode())
+        await safe_publish_data(ctx.room.local_participant, orjson.dumps(rejection_message))
         # Synthesize speech for the rejection message to provide audio feedback
         await synthesize_speech(rejection_response, ctx.room)
         # Send updated conversation data to keep UI synchronized
@@ -162,39 +164,45 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
         "is_hidden": is_hidden                       # Whether this should be hidden from history
     }
 
+    # Start speaking paragraphs as soon as the model produces them
+    on_delta, finish_speech = start_streaming_speech(ctx.room)
+
     # Generate the AI response using the text input and context
-    ai_response = generate_ai_response(text_input, context)
+    ai_response, conversation = await generate_ai_response(text_input, context, on_delta)
     # Check if the AI response is empty or just whitespace
     if not ai_response or not ai_response.strip():
         # Use fallback message if AI response generation failed
         ai_response = generate_fallback_message()
 
+    # Speak whatever part of the response hasn't been spoken while it was streaming
+    # Start it before publishing the text so speech doesn't wait on the text and list round trips
+    speech = asyncio.create_task(finish_speech(ai_response))
+
     # Send AI response to the client
     if current_conversation_id:
         # Create a structured response message for the client
         response_message = {
             "type": "ai_response",                      # Message type for client routing
             "text": ai_response,                        # The generated AI response text
-            "conversation_id": current_conversation_id  # Associated conversation ID
+            "conversation_id": current_conversation_id, # Associated conversation ID
+            "speech_streamed": True                     # Speech is sent separately, the client shouldn't auto-speak it
         }
         # Send the AI response to the client
-        await safe_publish_data(ctx.room.local_participant, json.dumps(response_message).encode())
+        await safe_publish_data(ctx.room.local_participant, orjson.dumps(response_message))
 
         # Send updated conversation list after AI response to ensure immediate history update
         try:
             # Get the user ID from the original message for proper conversation filtering
             user_id = message.get('user_id')
             # Retrieve updated conversation list asynchronously
-            conversations = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: database.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
-            )
+            conversations = await database_async.list_conversations(limit=config.CONVERSATION_LIST_LIMIT, user_id=user_id)
             # Create response message with updated conversation list
             list_response = {
                 "type": "conversations_list",  # Message type for client routing
                 "conversations": conversations  # Updated list of conversations
             }
             # Send the updated conversation list to the client
-            await safe_publish_data(ctx.room.local_participant, json.dumps(list_response).encode())
+            await safe_publish_data(ctx.room.local_participant, orjson.dumps(list_response))
         except Exception as e:
             # Log any errors during conversation list update
             logger.error(f"Error getting conversation list after AI response: {e}")
@@ -202,8 +210,8 @@ async def handle_text_input(message, ctx, current_conversation_id, safe_publish_
         # Log error if no valid conversation ID is available
         logger.error(config.ERROR_MESSAGES["no_conversation_id"])
 
-    # Synthesize speech for the AI response to provide audio feedback
-    await synthesize_speech(ai_response, ctx.room)
-    # Send updated conversation data to ensure UI is fully synchronized
-    await send_conversation_data(current_conversation_id, ctx.room.local_participant)
+    # Wait for the remaining speech to be published
+    await speech
+    # Send the messages stored this turn (hidden instructions store only the AI reply) so the UI stays in sync
+    await send_messages_appended(conversation, ctx.room.local_participant, 1 if is_hidden else 2)
     return current_conversation_id  # Return the conversation ID that was used
@@ -1,10 +1,46 @@
 import logging
-import requests
+import threading
+import time
 from typing import Tuple, List
+import orjson
 import config
+import ai_utils
 
 logger = logging.getLogger("topic_validator")
 
+# Circuit breaker state shared by both validation calls, which run on executor threads
+# While the circuit is open, questions are allowed without calling the API instead of each waiting out a timeout
+_breaker_lock = threading.Lock()
+_breaker = {
+    "failures": 0,         # Consecutive failed calls
+    "first_failure": 0.0,  # When the current run of failures started (monotonic seconds)
+    "open_until": 0.0      # Calls skip the API until this time (monotonic seconds)
+}
+
+def _circuit_open() -> bool:
+    """Return True while recent failures have paused validation calls"""
+    with _breaker_lock:
+        return time.monotonic() < _breaker["open_until"]
+
+def _record_success() -> None:
+    """Reset the failure count after a call that reached the API"""
+    with _breaker_lock:
+        _breaker["failures"] = 0
+
+def _record_failure() -> None:
+    """Count a failed call and open the circuit once too many happen within the failure window"""
+    now = time.monotonic()
+    with _breaker_lock:
+        # Start a new run if the previous failures are too old to count
+        if _breaker["failures"] == 0 or now - _breaker["first_failure"] > config.TOPIC_VALIDATION_FAILURE_WINDOW:
+            _breaker["failures"] = 0
+            _breaker["first_failure"] = now
+        _breaker["failures"] += 1
+        if _breaker["failures"] >= config.TOPIC_VALIDATION_FAILURE_THRESHOLD:
+            _breaker["failures"] = 0
+            _breaker["open_until"] = now + config.TOPIC_VALIDATION_COOLDOWN
+            logger.warning("Topic validation failing repeatedly, skipping the API for %ss", config.TOPIC_VALIDATION_COOLDOWN)
+
 def api_based_validation(text: str) -> Tuple[bool, str]:
     """
     Use AI API to validate if a question is related to computer science, programming, or technical topics.
@@ -36,6 +72,10 @@ def api_based_validation(text: str) -> Tuple[bool, str]:
         # Default to allowing questions when API is unavailable to avoid blocking users
         return True, "API unavailable - allowing question"
 
+    # Skip the API while the circuit breaker is open
+    if _circuit_open():
+        return True, "API circuit open - allowing question"
+
     # Simple validation prompt designed for binary classification
     # Uses clear, specific instructions to get consistent YES/NO responses
     validation_prompt = [
@@ -68,12 +108,6 @@ Be strict: only respond "YES" for clearly technical/programming topics."""
     ]
     
     try:
-        # Make API request with minimal parameters optimized for fast classification
-        headers = {
-            "Authorization": f"Bearer {config.GROQ_API_KEY}",  # API authentication
-            "Content-Type": "application/json"                 # Request content type
-        }
-
         # Configure request data for fast, consistent classification
         data = {
             "model": "llama-3.1-8b-instant",  # Use fastest model for validation to minimize latency
@@ -83,17 +117,18 @@ Be strict: only respond "YES" for clearly technical/programming topics."""
         }
 
         # Make the API request with a short timeout for responsiveness
-        response = requests.post(
+        # The shared Groq session supplies the authentication headers and a pooled keep-alive connection
+        response = ai_utils.get_session().post(
             config.GROQ_API_URL,  # Groq API endpoint
-            headers=headers,      # Authentication headers
-            json=data,           # Request payload
-            timeout=10           # Short timeout for validation (10 seconds)
+            data=orjson.dumps(data),  # Request payload, serialized with orjson
+            timeout=config.TOPIC_VALIDATION_TIMEOUT  # Short (connect, read) timeout so a hung socket can't hold the thread
         )
 
         # Process successful API responses
         if response.status_code == 200:
+            _record_success()
             # Parse the JSON response from the API
-            result = response.json()
+            result = orjson.loads(response.content)
             # Extract the AI's response and normalize to uppercase for comparison
             ai_response = result["choices"][0]["message"]["content"].strip().upper()
 
@@ -105,16 +140,18 @@ Be strict: only respond "YES" for clearly technical/programming topics."""
                 return False, "API confirmed: Not CS/programming related"
             else:
                 # Handle unexpected responses by defaulting to allow
-                logger.warning(f"Unexpected API response: {ai_response}")
+                logger.warning("Unexpected API response: %s", ai_response)
                 return True, "API response unclear - allowing question"
         else:
             # Handle API errors by defaulting to allow questions
-            logger.warning(f"API validation failed: {response.status_code}")
+            logger.warning("API validation failed: %s", response.status_code)
+            _record_failure()
             return True, "API error - allowing question"
 
     except Exception as e:
         # Handle any exceptions during API communication
-        logger.error(f"Error in API validation: {e}")
+        logger.error("Error in API validation: %s", e)
+        _record_failure()
         # Default to allowing questions when validation fails to avoid blocking users
         return True, "API error - allowing question"
 
@@ -205,16 +242,14 @@ def api_context_validation(current_question: str, conversation_history: List[dic
         # Default to allowing questions when API is unavailable to avoid blocking users
         return True, "API unavailable - allowing question"
 
+    # Skip the API while the circuit breaker is open
+    if _circuit_open():
+        return True, "API circuit open - allowing question"
+
     try:
         # Build context validation prompt with conversation history and current question
         prompt = build_context_validation_prompt(current_question, conversation_history)
 
-        # Make API request with authentication headers
-        headers = {
-            "Authorization": f"Bearer {config.GROQ_API_KEY}",  # API authentication token
-            "Content-Type": "application/json"                 # Request content type
-        }
-
         # Configure request data for fast, consistent context validation
         data = {
             "model": "llama-3.1-8b-instant",  # Fast model for validation to minimize latency
@@ -224,17 +259,18 @@ def api_context_validation(current_question: str, conversation_history: List[dic
         }
 
         # Make the API request with a short timeout for responsiveness
-        response = requests.post(
+        # The shared Groq session supplies the authentication headers and a pooled keep-alive connection
+        response = ai_utils.get_session().post(
             config.GROQ_API_URL,  # Groq API endpoint for chat completions
-            headers=headers,      # Authentication and content type headers
-            json=data,           # Request payload with model and validation prompt
-            timeout=10           # Short timeout for validation (10 seconds)
+            data=orjson.dumps(data),  # Request payload with model and validation prompt, serialized with orjson
+            timeout=config.TOPIC_VALIDATION_TIMEOUT  # Short (connect, read) timeout so a hung socket can't hold the thread
         )
 
         # Process successful API responses
         if response.status_code == 200:
+            _record_success()
             # Parse the JSON response from the API
-            result = response.json()
+            result = orjson.loads(response.content)
             # Extract the AI's response and normalize to uppercase for comparison
             ai_response = result["choices"][0]["message"]["content"].strip().upper()
 
@@ -246,16 +282,18 @@ def api_context_validation(current_question: str, conversation_history: List[dic
                 return False, "AI confirmed: Not related to CS discussion"
             else:
                 # Handle unexpected responses by defaulting to allow
-                logger.warning(f"Unexpected context API response: {ai_response}")
+                logger.warning("Unexpected context API response: %s", ai_response)
                 return True, "API response unclear - allowing question"
         else:
             # Handle API errors by defaulting to allow questions
-            logger.warning(f"Context API validation failed: {response.status_code}")
+            logger.warning("Context API validation failed: %s", response.status_code)
+            _record_failure()
             return True, "API error - allowing question"
 
     except Exception as e:
         # Handle any exceptions during API communication
-        logger.error(f"Error in context API validation: {e}")
+        logger.error("Error in context API validation: %s", e)
+        _record_failure()
         # Default to allowing questions when validation fails to avoid blocking users
         return True, "API error - allowing question"
 
@@ -264,7 +302,7 @@ def validate_question_topic(text: str, conversation_history: List[dict] = None)
     Main validation function that determines if a user's question is appropriate for the AI assistant.
     """
     # Log the validation attempt with truncated text for debugging
-    logger.info(f"Validating question topic: {text[:100]}...")
+    logger.debug("Validating question topic: %.100s...", text)
 
     # Basic input validation to filter out empty or very short questions
     if not text or len(text.strip()) < 3:
@@ -279,11 +317,11 @@ def validate_question_topic(text: str, conversation_history: List[dict] = None)
 
         # If context validation passes, allow the question
         if context_result:
-            logger.info(f"✅ Context validation PASSED: {context_reason}")
+            logger.info("✅ Context validation PASSED: %s", context_reason)
             return True, f"Context validation: {context_reason}"
         else:
             # If context validation fails, reject the question
-            logger.info(f"❌ Context validation FAILED: {context_reason}")
+            logger.info("❌ Context validation FAILED: %s", context_reason)
             return False, f"Context validation: {context_reason}"
 
     # Fall back to single-question API validation
@@ -292,8 +330,8 @@ def validate_question_topic(text: str, conversation_history: List[dict] = None)
 
     # Return the result of single-question validation
     if api_result:
-        logger.info(f"✅ API validation PASSED: {api_reason}")
+        logger.info("✅ API validation PASSED: %s", api_reason)
         return True, f"API validation: {api_reason}"
     else:
-        logger.info(f"❌ API validation FAILED: {api_reason}")
+        logger.info("❌ API validation FAILED: %s", api_reason)
         return False, f"API validation: {api_reason}"
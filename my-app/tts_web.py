@@ -1,16 +1,19 @@
 
 import logging
-import json
+import orjson
 from typing import Optional, List
 
 logger = logging.getLogger("web-tts")
 
+# The browser picks the actual system voice, so the catalogue is fixed and known without any lookup
+VOICES = ("Web Voice",)
+
 class WebTTS:
     """Text-to-speech engine using web browser's speech synthesis"""
 
     def __init__(self):
         """Initialize the Web TTS engine"""
-        self.default_voice_name = "Web Voice"
+        self.default_voice_name = VOICES[0]
         self.use_fallback = False
         logger.info("Web TTS engine initialized")
 
@@ -20,7 +23,7 @@ class WebTTS:
         Returns:
             list: A list of available voice names
         """
-        return ["Web Voice"]
+        return list(VOICES)
 
     def synthesize(self, text: str, voice_name: Optional[str] = None) -> Optional[bytes]:
         """Synthesize speech from text"""
@@ -29,7 +32,7 @@ class WebTTS:
             return None
 
         try:
-            logger.info(f"Preparing text for web TTS: {text[:50]}...")
+            logger.debug("Preparing text for web TTS: %.50s...", text)
 
             # For web TTS, we don't actually generate audio here
             # Instead, we create a JSON message that tells the frontend to use web speech synthesis
@@ -39,12 +42,12 @@ class WebTTS:
                 "voice": voice_name or self.default_voice_name
             }
 
-            # Convert the message to JSON and then to bytes
-            message_bytes = json.dumps(web_tts_message).encode('utf-8')
+            # Serialize the message straight to JSON bytes
+            message_bytes = orjson.dumps(web_tts_message)
 
-            logger.info("Web TTS preparation complete")
+            logger.debug("Web TTS preparation complete")
             return message_bytes
 
         except Exception as e:
-            logger.error(f"Error in web TTS preparation: {e}")
+            logger.error("Error in web TTS preparation: %s", e)
             return None